@@ -0,0 +1,192 @@
+import os
+import sys
+import glob
+import argparse
+import warnings
+from collections import namedtuple
+import numpy as np
+from results_cube import label_indices, load_results_table
+from results_writer import (DEFAULT_OUTPUT, FORMATS, OutputOptions, ResultsWriter,
+                            check_formats)
+
+# 默认输出的百分位数（50即中位数）
+DEFAULT_PERCENTILES = (16, 50, 84)
+# 汇总表格的文件名前缀
+DEFAULT_NAME = "ida_summary"
+
+# 一组results表格叠放成的三维数组：文件夹 × 纤维位置 × B记录，缺失或error的单元格为NaN
+ResultsStack = namedtuple('ResultsStack', ['folders', 'positions', 'records', 'values'])
+
+def folder_label(file_path):
+    """由results文件名得到文件夹名：去掉扩展名和末尾的_results"""
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return name[:-len("_results")] if name.endswith("_results") else name
+
+def folder_labels(files):
+    """每个results文件的文件夹名，文件名相同（如不同节点的nodeA/S2_results.txt和nodeB/S2_results.txt）
+    时加上所在目录名区分，仍然重复时抛出ValueError
+    """
+    labels = [folder_label(path) for path in files]
+    labels = [f"{os.path.basename(os.path.dirname(os.path.abspath(path)))}/{label}"
+              if labels.count(label) > 1 else label for path, label in zip(files, labels)]
+    for path, label in zip(files, labels):
+        if labels.count(label) > 1:
+            raise ValueError(f"无法区分文件夹名相同的results文件：{label}（{path}）")
+    return labels
+
+def expand_inputs(patterns):
+    """展开通配符（Windows命令行不会自动展开），保持给定顺序并去掉重复的文件"""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        files += [path for path in matches if path not in files]
+    return files
+
+def stack_tables(tables):
+    """将{文件夹名: ResultsTable}叠放为ResultsStack
+
+    纤维位置和B记录为全部表格的并集，分别按数值和B后的编号排序，表格中没有的单元格为NaN。
+    """
+    folders = list(tables)
+    positions, records = [], []
+    for table in tables.values():
+        positions += [label for label in table.row_labels if label not in positions]
+        records += [label for label in table.col_labels if label not in records]
+    positions.sort(key=float)
+    records.sort(key=lambda label: int(label[1:]))
+
+    values = np.full((len(folders), len(positions), len(records)), np.nan)
+    for f, table in enumerate(tables.values()):
+        rows = label_indices(positions, table.row_labels)
+        cols = label_indices(records, table.col_labels)
+        values[f][np.ix_(rows, cols)] = table.values
+    return ResultsStack(folders, positions, records, values)
+
+def load_stack(files):
+    """读取results文件（txt或npz）并叠放，文件夹名取自文件名，见folder_labels"""
+    return stack_tables({label: load_results_table(path)
+                         for label, path in zip(folder_labels(files), files)})
+
+def percentiles(stack, qs=DEFAULT_PERCENTILES):
+    """各位置、各B记录在全部文件夹上的百分位数，形状为(百分位数 × 位置 × B记录)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # 全部为NaN的单元格结果为NaN
+        return np.nanpercentile(stack.values, qs, axis=0)
+
+def envelopes(stack):
+    """包络最大值：返回(各位置、各B记录在全部文件夹上的最大值, 各文件夹、各位置在全部B记录上的最大值)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmax(stack.values, axis=0), np.nanmax(stack.values, axis=2)
+
+def exceedances(stack, thresholds):
+    """超过各阈值的统计，NaN视为未超过
+
+    返回(counts, folder_counts, first)：counts为每个文件夹、每个位置超过阈值的B记录数
+    (阈值 × 文件夹 × 位置)；folder_counts为每个位置、每个B记录超过阈值的文件夹数
+    (阈值 × 位置 × B记录)；first为首个超过阈值的B记录序号（按B编号排序），从未超过为-1。
+    """
+    with np.errstate(invalid="ignore"):
+        exceeded = stack.values[None] > np.asarray(thresholds, dtype=float)[:, None, None, None]
+    counts = exceeded.sum(axis=3)
+    folder_counts = exceeded.sum(axis=1)
+    first = np.where(exceeded.any(axis=3), exceeded.argmax(axis=3), -1)
+    return counts, folder_counts, first
+
+def threshold_label(threshold):
+    """阈值在文件名中的写法，如2、0.5"""
+    return f"{threshold:g}"
+
+def write_summary(stack, output_dir, name=DEFAULT_NAME, qs=DEFAULT_PERCENTILES, thresholds=(),
+                  output=DEFAULT_OUTPUT):
+    """计算全部汇总量并一次写出，返回写出的文件路径列表
+
+    位置 × B记录的表格沿用b\\a格式；文件夹 × 位置的表格表头为folder\\b。
+    """
+    writer = ResultsWriter.from_options(output_dir, name, output)
+    for q, table in zip(qs, percentiles(stack, qs)):
+        writer.add(f"{name}_p{q:g}", stack.positions, stack.records, table)
+    envelope, folder_envelope = envelopes(stack)
+    writer.add(f"{name}_envelope", stack.positions, stack.records, envelope)
+    writer.add(f"{name}_folder_envelope", stack.folders, stack.positions, folder_envelope,
+               corner="folder\\b")
+
+    if len(thresholds):
+        counts, folder_counts, first = exceedances(stack, thresholds)
+        # 首个超过阈值的B记录：数值为B编号，文本为标签，序号-1对应NaN和"-"
+        records = np.array(stack.records + ["-"], dtype=object)
+        numbers = np.array([int(record[1:]) for record in stack.records] + [np.nan])
+        for t, threshold in enumerate(thresholds):
+            label = threshold_label(threshold)
+            # 计数为整数，文本不带小数
+            writer.add(f"{name}_exceed_{label}_count", stack.folders, stack.positions,
+                       counts[t], counts[t].astype(str), corner="folder\\b", keep_text=True)
+            writer.add(f"{name}_exceed_{label}_folders", stack.positions, stack.records,
+                       folder_counts[t], folder_counts[t].astype(str), keep_text=True)
+            writer.add(f"{name}_exceed_{label}_first", stack.folders, stack.positions,
+                       numbers[first[t]], records[first[t]], corner="folder\\b",
+                       keep_text=True)
+    return writer.write()
+
+def parse_numbers(text):
+    """逗号分隔的数值列表"""
+    return tuple(float(x) for x in text.split(",") if x.strip())
+
+def build_parser():
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        description="汇总多个文件夹的results表格（如一组IDA参数分析），输出百分位数、包络和超限统计")
+    parser.add_argument("inputs", nargs="+",
+                        help="process_barfiber生成的[文件夹名]_results.txt或.npz，可用通配符")
+    parser.add_argument("-o", "--output-dir", required=True, help="输出文件夹")
+    parser.add_argument("--name", default=DEFAULT_NAME,
+                        help="汇总表格的文件名前缀（默认：%(default)s）")
+    parser.add_argument("--percentiles", default=",".join(str(q) for q in DEFAULT_PERCENTILES),
+                        help="逗号分隔的百分位数，50为中位数（默认：%(default)s）")
+    parser.add_argument("--thresholds", default="",
+                        help="逗号分隔的应变阈值（与results表格相同单位，即已乘以放大系数），"
+                             "输出超过阈值的B记录数、文件夹数和首个超过阈值的B记录")
+    parser.add_argument("--formats", default=",".join(DEFAULT_OUTPUT.formats),
+                        help=f"逗号分隔的输出格式，可选{'、'.join(FORMATS)}（默认：%(default)s）")
+    parser.add_argument("--precision", type=int, default=None,
+                        help="文本表格保留的小数位数（默认：原样输出）")
+    return parser
+
+def main(argv=None):
+    """命令行入口，返回退出码：0成功，1读取失败，2参数错误"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        qs = parse_numbers(args.percentiles)
+        thresholds = parse_numbers(args.thresholds)
+    except ValueError:
+        parser.error("百分位数和阈值必须为逗号分隔的数值")
+    if not qs or any(q < 0 or q > 100 for q in qs):
+        parser.error("百分位数必须在0到100之间")
+    formats = tuple(fmt.strip() for fmt in args.formats.split(",") if fmt.strip())
+    try:
+        check_formats(formats)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.precision is not None and args.precision < 0:
+        parser.error("小数位数不能为负数")
+    if not os.path.isdir(args.output_dir):
+        parser.error(f"输出文件夹不存在：{args.output_dir}")
+    files = expand_inputs(args.inputs)
+    if not files:
+        parser.error("没有找到results文件")
+
+    try:
+        stack = load_stack(files)
+    except (OSError, ValueError, IndexError) as e:
+        print(f"读取results文件时出错：{str(e)}", file=sys.stderr)
+        return 1
+    print(f"已读取 {len(stack.folders)} 个文件夹：{len(stack.positions)} 个纤维位置 × "
+          f"{len(stack.records)} 个B记录")
+    for path in write_summary(stack, args.output_dir, args.name, qs, thresholds,
+                              OutputOptions(formats, args.precision)):
+        print(f"汇总结果已保存到：{path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import os
+import json
+import hashlib
+import sqlite3
+from line_errors import LineErrors, limits_key
+from recorder_store import Checkpoint
+
+# 缓存文件名，保存在被处理的文件夹中
+CACHE_FILENAME = ".process_barfiber_cache.sqlite"
+# 归约结果的格式版本，process_file的输出含义改变时递增，旧缓存自动失效（5：检查点状态改为JSON）
+CACHE_VERSION = 5
+
+def shard_cache_filename(shard):
+    """分片运行时每个分片使用单独的缓存文件，避免多个节点同时写入共享文件夹中的同一个数据库"""
+    index, count = shard
+    return f".process_barfiber_cache.shard-{index}-of-{count}.sqlite"
+
+def file_fingerprint(file_path):
+    """返回文件的(大小, 修改时间ns)"""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+def file_hash(file_path, block_size=1024 * 1024):
+    """计算文件内容的SHA-1"""
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+class ReductionCache:
+    """单个文件夹的归约结果缓存
+
+    以文件名、统计量组合与错误上限、大小、修改时间和内容哈希为键，保存各统计量的结果和错误行。
+    大小和修改时间一致时直接命中；只有修改时间变化时再比较内容哈希（归约时读取文件顺便计算，
+    从检查点继续读取或读取列式数组时没有内容哈希，此时视为未命中，再由检查点判断是否只需读取新增部分）。
+    同时保存读取结束时的检查点，文件被追加内容后只需读取新增的部分。
+    """
+
+    def __init__(self, folder_path, rebuild=False, filename=CACHE_FILENAME):
+        self.path = os.path.join(folder_path, filename)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if rebuild or row is None or int(row[0]) != CACHE_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS reductions")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                              (str(CACHE_VERSION),))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS reductions ("
+            "name TEXT, stats TEXT, size INTEGER, mtime_ns INTEGER, sha1 TEXT, "
+            "vals TEXT, errors TEXT, offset INTEGER, lines INTEGER, prefix_sha1 TEXT, "
+            "state BLOB, PRIMARY KEY (name, stats))")
+        self.conn.commit()
+
+    def lookup(self, file_path, fingerprint, stats, limits):
+        """查找缓存，命中时返回({统计量: 值}, LineErrors)，否则返回None"""
+        name = os.path.basename(file_path)
+        key = f"{','.join(stats)}|{limits_key(limits)}"
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, sha1, vals, errors FROM reductions "
+            "WHERE name = ? AND stats = ?", (name, key)).fetchone()
+        if row is None:
+            return None
+        size, mtime_ns, sha1, values, errors = row
+        if size != fingerprint[0]:
+            return None
+        if mtime_ns != fingerprint[1]:
+            # 修改时间变化但大小相同，按内容哈希判断是否真正改变
+            if sha1 is None or file_hash(file_path) != sha1:
+                return None
+            self.conn.execute("UPDATE reductions SET mtime_ns = ? WHERE name = ? AND stats = ?",
+                              (fingerprint[1], name, key))
+        errors = json.loads(errors)
+        return json.loads(values), LineErrors(limits, errors['lines'], errors['total'],
+                                              errors['aborted'])
+
+    def checkpoint(self, file_path, stats, limits):
+        """返回文件上次读取结束时的Checkpoint，没有时返回None"""
+        row = self.conn.execute(
+            "SELECT offset, lines, prefix_sha1, state FROM reductions WHERE name = ? AND stats = ?",
+            (os.path.basename(file_path), f"{','.join(stats)}|{limits_key(limits)}")).fetchone()
+        if row is None or row[3] is None:
+            return None
+        return Checkpoint(*row)
+
+    def store(self, file_path, fingerprint, stats, limits, values, errors, checkpoint=None,
+              sha1=None):
+        """保存单个文件的归约结果，values为{统计量: 值或None}，errors为LineErrors
+
+        sha1为归约时读取的完整内容的SHA-1（没有时为None），不再单独读取文件计算。
+        """
+        values = {spec: None if v is None else float(v) for spec, v in values.items()}
+        errors = {'lines': list(errors), 'total': errors.total, 'aborted': errors.aborted}
+        checkpoint = checkpoint or Checkpoint(None, None, None, None)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO reductions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (os.path.basename(file_path), f"{','.join(stats)}|{limits_key(limits)}",
+             fingerprint[0], fingerprint[1], sha1, json.dumps(values),
+             json.dumps(errors, ensure_ascii=False), checkpoint.offset, checkpoint.lines,
+             checkpoint.sha1, checkpoint.state))
+
+    def prune(self, file_paths):
+        """删除不在file_paths中的文件的缓存记录"""
+        keep = {os.path.basename(p) for p in file_paths}
+        names = [r[0] for r in self.conn.execute("SELECT name FROM reductions")]
+        self.conn.executemany("DELETE FROM reductions WHERE name = ?",
+                              [(n,) for n in names if n not in keep])
+
+    def commit(self):
+        """提交已保存的结果，长时间运行（如监视模式）时定期调用"""
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
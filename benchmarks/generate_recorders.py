@@ -0,0 +1,98 @@
+import os
+import sys
+import argparse
+import numpy as np
+
+# OpenSees记录器的时间步长
+TIME_STEP = 0.000195313
+DEFAULT_RECORDS = [4, 12, 18, 20, 22, 24, 26, 28, 30, 32, 34, 36, 38, 40, 42, 44, 46]
+DEFAULT_POSITIONS = [-31, -18.8, -6.5, 0, 10, 20, 30, 40, 50, 60, 70]
+# 格式错误行的几种形式：OpenSees中断时的截断行、乱码和非法数值
+MALFORMED_LINES = ["0.0123 -0.000", "nan(ind) 1.#QNAN", "\x00\x00\x00", "0.0123 1.234e-"]
+
+def extend_labels(defaults, count, step):
+    """取前count个默认编号，不足时按step递增补充"""
+    extra = [defaults[-1] + step * (i + 1) for i in range(max(0, count - len(defaults)))]
+    return (list(defaults) + extra)[:count]
+
+def write_recorder(path, rows, columns, malformed_rate=0.0, seed=0):
+    """生成一个OpenSees风格的.out文件：第一列为时间，其余列为衰减的振荡响应
+
+    malformed_rate为每行被替换为格式错误行的概率。返回写入的字节数。
+    """
+    rng = np.random.default_rng(seed)
+    time = np.arange(1, rows + 1) * TIME_STEP
+    freq = rng.uniform(0.5, 5.0, columns - 1)
+    amp = rng.uniform(1e-4, 5e-3, columns - 1)
+    data = np.empty((rows, columns))
+    data[:, 0] = time
+    data[:, 1:] = (amp * np.exp(-0.05 * time[:, None])
+                   * np.sin(2 * np.pi * freq * time[:, None])
+                   + rng.normal(0, 1e-5, (rows, columns - 1)))
+
+    lines = [" ".join(f"{v:.6g}" for v in row) for row in data]
+    if malformed_rate > 0:
+        for i in np.flatnonzero(rng.random(rows) < malformed_rate):
+            lines[i] = MALFORMED_LINES[i % len(MALFORMED_LINES)]
+    text = "\n".join(lines) + "\n"
+    with open(path, 'w') as f:
+        f.write(text)
+    return len(text.encode())
+
+def generate_folder(folder_path, rows, columns=3, malformed_rate=0.0,
+                    records=DEFAULT_RECORDS, positions=DEFAULT_POSITIONS,
+                    specimen="S2", load="8.5", channel="barfiber"):
+    """生成一个IDA文件夹：每个(记录, 位置)组合一个文件，返回(文件数, 总字节数)"""
+    os.makedirs(folder_path, exist_ok=True)
+    total_bytes = 0
+    count = 0
+    for record in records:
+        for position in positions:
+            filename = f"{specimen}_B{record}_IDA_{load}MPa_{channel}{position}.out"
+            total_bytes += write_recorder(os.path.join(folder_path, filename), rows, columns,
+                                          malformed_rate, seed=count)
+            count += 1
+    return count, total_bytes
+
+def write_results_files(output_dir, a_values=(100, 200, 300, 400, 500, 600, 700),
+                        records=DEFAULT_RECORDS, positions=DEFAULT_POSITIONS,
+                        error_rate=0.02, seed=0):
+    """生成process_results使用的results文件，每个A值一个，返回{A值: 路径}"""
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = {}
+    for a in a_values:
+        path = os.path.join(output_dir, f"results_{a}.txt")
+        with open(path, 'w') as f:
+            f.write("\t".join(["b\\a"] + [f"B{r}" for r in records]) + "\n")
+            for position in positions:
+                cells = [str(v) if rng.random() >= error_rate else "error"
+                         for v in rng.uniform(0.5, 50, len(records))]
+                f.write("\t".join([str(float(position))] + cells) + "\n")
+        paths[a] = path
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成用于基准测试的OpenSees风格记录文件")
+    parser.add_argument("folder", help="输出文件夹")
+    parser.add_argument("--rows", type=int, default=165000, help="每个文件的行数（默认：%(default)s）")
+    parser.add_argument("--columns", type=int, default=3, help="列数，含时间列（默认：%(default)s）")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="格式错误行的比例（默认：%(default)s）")
+    parser.add_argument("--records", type=int, default=len(DEFAULT_RECORDS),
+                        help="B记录数（默认：%(default)s）")
+    parser.add_argument("--positions", type=int, default=len(DEFAULT_POSITIONS),
+                        help="纤维位置数（默认：%(default)s）")
+    args = parser.parse_args(argv)
+    if args.columns < 2:
+        parser.error("列数至少为2（时间列和一列数据）")
+
+    records = extend_labels(DEFAULT_RECORDS, args.records, 2)
+    positions = extend_labels(DEFAULT_POSITIONS, args.positions, 10)
+    count, total_bytes = generate_folder(args.folder, args.rows, args.columns,
+                                         args.malformed_rate, records, positions)
+    print(f"已生成 {count} 个文件，共 {total_bytes / 1e6:.1f} MB")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import numpy as np
+from generate_recorders import (DEFAULT_POSITIONS, DEFAULT_RECORDS, extend_labels,
+                                generate_folder, write_results_files)
+
+# 各档数据规模对应的每文件行数
+SIZES = {'small': 10000, 'medium': 50000, 'large': 165000}
+ALL_STATS = ('maxabs', 'peak_time', 'rms', 'residual', 'window_max:5:10')
+
+def peak_rss_kb():
+    """当前进程的峰值常驻内存（KB），无法获取时返回None"""
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss // 1024 if sys.platform == 'darwin' else rss  # macOS单位为字节
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset // 1024
+    except (ImportError, AttributeError):
+        return None
+
+def folder_tasks(folder):
+    import process_barfiber
+    from recorder_index import FolderIndex
+    groups = process_barfiber.list_channel_tasks(FolderIndex(folder))
+    return groups[process_barfiber.DEFAULT_CHANNEL]
+
+def stage_scan(folder, output_dir):
+    """扫描：建立文件夹索引并列出待处理文件"""
+    start = time.perf_counter()
+    tasks = folder_tasks(folder)
+    return {'seconds': time.perf_counter() - start, 'files': len(tasks)}
+
+def stage_parse(folder, output_dir):
+    """解析：process_file逐个计算最后一列的最大绝对值"""
+    import process_barfiber
+    tasks = folder_tasks(folder)
+    start = time.perf_counter()
+    for task in tasks:
+        process_barfiber.process_file(task[0])
+    return {'seconds': time.perf_counter() - start, 'files': len(tasks)}
+
+def stage_reduce(folder, output_dir):
+    """归约：单次读取计算全部统计量"""
+    from reduction_engine import reduce_file_stats
+    tasks = folder_tasks(folder)
+    start = time.perf_counter()
+    for task in tasks:
+        reduce_file_stats(task[0], ALL_STATS)
+    return {'seconds': time.perf_counter() - start, 'files': len(tasks)}
+
+def stage_write(folder, output_dir):
+    """写出：与process_folder相同，将归约结果写为b\\a表格和错误日志（不含解析时间）"""
+    import process_barfiber
+    channel_results = process_barfiber.assemble_channels(process_barfiber.reduce_channels(folder))
+    start = time.perf_counter()
+    output_paths, _ = process_barfiber.write_channel_outputs(
+        output_dir, "bench", process_barfiber.DEFAULT_STATS, channel_results)
+    return {'seconds': time.perf_counter() - start, 'files': len(output_paths)}
+
+def stage_extract(folder, output_dir):
+    """列提取：column_extractor一次读取写出全部列"""
+    import column_extractor
+    tasks = folder_tasks(folder)
+    start = time.perf_counter()
+    for task in tasks:
+        column_extractor.extract_columns(
+            task[0], "all", lambda n: column_extractor.column_output_path(output_dir, task[0], n))
+    return {'seconds': time.perf_counter() - start, 'files': len(tasks)}
+
+def stage_decimate(folder, output_dir):
+    """降采样导出：column_extractor按min/max降采样为2000个点"""
+    import column_extractor
+    tasks = folder_tasks(folder)
+    start = time.perf_counter()
+    for task in tasks:
+        column_extractor.decimate_columns(
+            task[0], "all", lambda n: column_extractor.column_output_path(output_dir, task[0], n),
+            2000)
+    return {'seconds': time.perf_counter() - start, 'files': len(tasks)}
+
+def stage_results(folder, output_dir):
+    """results处理：ResultProcessor的功能1和功能2（全部A值和b值）"""
+    from process_results import ResultProcessor
+    files = write_results_files(os.path.join(output_dir, "results_in"))
+    # 跳过__init__，不创建Tk窗口
+    processor = ResultProcessor.__new__(ResultProcessor)
+    processor.array_A = list(files)
+    processor.array_B = [f"{i/10:.1f}g" for i in range(1, 18)]
+    processor.selected_files = files
+    processor._session = None
+    start = time.perf_counter()
+    processor.generate_function1_output(list(files), processor.array_B, output_dir)
+    processor.generate_function2_output(list(files), processor.array_B, output_dir)
+    return {'seconds': time.perf_counter() - start, 'files': len(files)}
+
+STAGES = {
+    'scan': stage_scan,
+    'parse': stage_parse,
+    'reduce': stage_reduce,
+    'write': stage_write,
+    'extract': stage_extract,
+    'decimate': stage_decimate,
+    'results': stage_results,
+}
+
+def measure(stage, folder, output_dir):
+    """在子进程中运行，附加该进程的峰值内存"""
+    result = STAGES[stage](folder, output_dir)
+    result['peak_rss_kb'] = peak_rss_kb()
+    return result
+
+def run_isolated(stage, folder, output_dir):
+    """每个阶段使用新的进程，使峰值内存互不影响"""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(measure, stage, folder, output_dir).result()
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(sizes, stages, columns, malformed_rate, records, positions, workdir):
+    entries = []
+    for size in sizes:
+        rows = SIZES[size] if size in SIZES else int(size)
+        folder = os.path.join(workdir, f"S2_{size}")
+        file_count, total_bytes = generate_folder(folder, rows, columns, malformed_rate,
+                                                  records, positions)
+        for stage in stages:
+            output_dir = os.path.join(workdir, f"out_{size}_{stage}")
+            os.makedirs(output_dir, exist_ok=True)
+            result = run_isolated(stage, folder, output_dir)
+            seconds = result['seconds']
+            entry = {
+                'stage': stage,
+                'size': size,
+                'rows_per_file': rows,
+                'files': result['files'],
+                'seconds': round(seconds, 6),
+                'peak_rss_kb': result['peak_rss_kb'],
+            }
+            if stage in ('parse', 'reduce', 'extract', 'decimate'):
+                entry['mb_per_s'] = round(total_bytes / 1e6 / seconds, 3)
+                entry['rows_per_s'] = round(rows * file_count / seconds, 1)
+            entries.append(entry)
+            print(f"{size:>8} {stage:>8}: {seconds:8.3f} s"
+                  + (f"  {entry['mb_per_s']:8.1f} MB/s  {entry['rows_per_s']:12.0f} 行/s"
+                     if 'mb_per_s' in entry else "")
+                  + (f"  峰值内存 {entry['peak_rss_kb'] / 1024:.0f} MB"
+                     if entry['peak_rss_kb'] else ""))
+    return entries
+
+def compare(entries, baseline_path, threshold):
+    """与基准报告比较，返回变慢超过threshold的阶段数"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(e['stage'], e['size']): e for e in json.load(f)['results']}
+    regressions = 0
+    print(f"\n与 {baseline_path} 比较（耗时比值，>1表示变慢）：")
+    for entry in entries:
+        old = baseline.get((entry['stage'], entry['size']))
+        if old is None or not old['seconds']:
+            continue
+        ratio = entry['seconds'] / old['seconds']
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- 变慢"
+            regressions += 1
+        print(f"{entry['size']:>8} {entry['stage']:>8}: {ratio:6.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="后处理工具的吞吐量基准测试")
+    parser.add_argument("--sizes", default="small,medium",
+                        help=f"逗号分隔的数据规模，可选{','.join(SIZES)}或每文件行数（默认：%(default)s）")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help="逗号分隔的测试阶段（默认：%(default)s）")
+    parser.add_argument("--columns", type=int, default=3, help="每个文件的列数（默认：%(default)s）")
+    parser.add_argument("--malformed-rate", type=float, default=0.0005,
+                        help="格式错误行的比例（默认：%(default)s）")
+    parser.add_argument("--records", type=int, default=4, help="B记录数（默认：%(default)s）")
+    parser.add_argument("--positions", type=int, default=4, help="纤维位置数（默认：%(default)s）")
+    parser.add_argument("-o", "--output", default="bench_report.json",
+                        help="JSON报告路径（默认：%(default)s）")
+    parser.add_argument("--compare", help="用于比较的历史JSON报告")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="判定为变慢的耗时增加比例（默认：%(default)s）")
+    parser.add_argument("--workdir", help="生成数据的目录（默认使用临时目录并在结束后删除）")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    for size in sizes:
+        if size not in SIZES and not size.isdigit():
+            parser.error(f"未知的数据规模：{size}")
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error(f"未知的测试阶段：{stage}（可选：{', '.join(STAGES)}）")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ops_bench_")
+    try:
+        entries = run(sizes, stages, args.columns, args.malformed_rate,
+                      extend_labels(DEFAULT_RECORDS, args.records, 2),
+                      extend_labels(DEFAULT_POSITIONS, args.positions, 10), workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'config': {'columns': args.columns, 'malformed_rate': args.malformed_rate,
+                   'records': args.records, 'positions': args.positions},
+        'results': entries,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"\n报告已保存到：{args.output}")
+
+    if args.compare:
+        return 1 if compare(entries, args.compare, args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from postproc import COMMANDS
+
+# 统计是否被导入的重量级模块
+HEAVY_MODULES = ('numpy', 'tkinter', 'multiprocessing', 'sqlite3')
+
+# 在新解释器中导入模块，输出导入耗时和已加载的重量级模块
+IMPORT_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds,
+                  'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def time_command(args, repeat):
+    """运行命令repeat次，返回墙钟耗时的中位数和最小值（秒）"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=REPO_DIR, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), min(times)
+
+def probe_import(module, repeat):
+    """在新解释器中导入模块repeat次，返回导入耗时中位数和导入后已加载的重量级模块"""
+    code = IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+    results = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output))
+    return statistics.median(r['seconds'] for r in results), results[-1]['loaded']
+
+def run(exe, repeat):
+    entries = []
+    baseline, _ = time_command([sys.executable, "-c", "pass"], repeat)
+    print(f"{'python空进程':>16}: {baseline:8.3f} s")
+    for command, (module, cli, _, _) in COMMANDS.items():
+        entry = {'command': command, 'module': module}
+        entry['import_seconds'], entry['loaded'] = probe_import(module, repeat)
+        if cli is not None:
+            # -h只解析参数即退出，耗时即启动并加载该命令所需模块的时间
+            args = ([exe] if exe else [sys.executable, os.path.join(REPO_DIR, "postproc.py")])
+            median, best = time_command(args + [command, "-h"], repeat)
+            entry['cli_seconds'] = round(median, 6)
+            entry['cli_best_seconds'] = round(best, 6)
+        entry['import_seconds'] = round(entry['import_seconds'], 6)
+        entries.append(entry)
+        print(f"{command:>16}: 导入 {entry['import_seconds']:6.3f} s"
+              + (f"  启动(-h) {entry['cli_seconds']:6.3f} s" if 'cli_seconds' in entry else "")
+              + f"  已加载：{', '.join(entry['loaded']) or '无'}")
+    return baseline, entries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="各工具的冷启动耗时基准测试")
+    parser.add_argument("--exe", help="打包后的postproc可执行文件，不指定时测量python postproc.py")
+    parser.add_argument("-n", "--repeat", type=int, default=5,
+                        help="每项重复次数，取中位数（默认：%(default)s）")
+    parser.add_argument("-o", "--output", default="startup_report.json",
+                        help="JSON报告路径（默认：%(default)s）")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("重复次数必须为正整数")
+
+    baseline, entries = run(args.exe, args.repeat)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'exe': args.exe,
+        'repeat': args.repeat,
+        'python_baseline_seconds': round(baseline, 6),
+        'results': entries,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"\n报告已保存到：{args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+import os
+import re
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from line_errors import DEFAULT_LIMITS, ErrorLimits, LineErrors, write_error_log
+from recorder_index import DEFAULT_TEMPLATE, FolderIndex, compile_template
+from recorder_store import CHUNK_BYTES, iter_byte_blocks, open_columnar
+from reduction_engine import iter_columnar_blocks, parse_rows
+from results_writer import (DEFAULT_OUTPUT, FORMATS, OutputOptions, ResultsWriter,
+                            check_formats)
+
+# 默认连接的两个通道：位移（第一列为时间）和101节点加速度
+DEFAULT_DISP = "disp"
+DEFAULT_ACC = "acc101"
+# 两个文件的时间相差不超过该值（秒）时视为同一时刻
+DEFAULT_TOLERANCE = 1e-6
+DEFAULT_QUANTITIES = ('drift', 'acc_at_peak_disp', 'energy')
+
+class PeakDrift:
+    """最大位移角：max|u| / height，height默认为1（即峰值位移）"""
+
+    def __init__(self, height=1.0):
+        self.height = float(height)
+        self.value = None
+
+    def update(self, times, disp, acc):
+        peak = np.abs(disp).max()
+        self.value = peak if self.value is None else max(self.value, peak)
+
+    def result(self):
+        return None if self.value is None else self.value / self.height
+
+class ResidualDrift:
+    """残余位移角：记录结束时的u / height"""
+
+    def __init__(self, height=1.0):
+        self.height = float(height)
+        self.value = None
+
+    def update(self, times, disp, acc):
+        self.value = disp[-1]
+
+    def result(self):
+        return None if self.value is None else self.value / self.height
+
+class AccAtPeakDisp:
+    """位移绝对值达到最大时刻的加速度，并列时取最早出现的时刻"""
+
+    def __init__(self):
+        self.peak = None
+        self.value = None
+
+    def update(self, times, disp, acc):
+        idx = np.abs(disp).argmax()
+        if self.peak is None or abs(disp[idx]) > self.peak:
+            self.peak, self.value = abs(disp[idx]), acc[idx]
+
+    def result(self):
+        return self.value
+
+class PeakAcc:
+    """加速度的最大绝对值"""
+
+    def __init__(self):
+        self.value = None
+
+    def update(self, times, disp, acc):
+        peak = np.abs(acc).max()
+        self.value = peak if self.value is None else max(self.value, peak)
+
+    def result(self):
+        return self.value
+
+class Energy:
+    """耗能：-mass × ∫a du（梯形积分）
+
+    acc为绝对加速度时即恢复力与阻尼力所做的功（滞回耗能与阻尼耗能之和），
+    mass默认为1（单位质量的耗能）。相邻块之间的积分段也计入。
+    """
+
+    def __init__(self, mass=1.0):
+        self.mass = float(mass)
+        self.total = None
+        self.last = None  # 上一块最后一行的(u, a)
+
+    def update(self, times, disp, acc):
+        if self.last is not None:
+            disp = np.concatenate(([self.last[0]], disp))
+            acc = np.concatenate(([self.last[1]], acc))
+        work = np.sum((acc[1:] + acc[:-1]) * np.diff(disp)) / 2
+        self.total = work if self.total is None else self.total + work
+        self.last = (disp[-1], acc[-1])
+
+    def result(self):
+        return None if self.total is None else -self.mass * self.total
+
+# 派生量名称 → 类；带参数时写作"名称:参数"，如drift:3000（高度）、energy:2.5（质量）
+QUANTITIES = {
+    'drift': PeakDrift,
+    'residual_drift': ResidualDrift,
+    'acc_at_peak_disp': AccAtPeakDisp,
+    'peak_acc': PeakAcc,
+    'energy': Energy,
+}
+
+def make_quantity(spec):
+    """根据描述字符串创建派生量对象，名称或参数无效时抛出ValueError"""
+    name, *params = spec.split(':')
+    if name not in QUANTITIES:
+        raise ValueError(f"未知的派生量：{name}（可选：{', '.join(QUANTITIES)}）")
+    try:
+        return QUANTITIES[name](*params)
+    except TypeError:
+        raise ValueError(f"派生量 {spec} 的参数个数不正确")
+
+def parse_channel(text):
+    """通道参数，如acc101，返回(通道名, 位置或None)，与文件名模板的channel、b字段对应"""
+    match = re.fullmatch(r'([A-Za-z]+)([-.0-9]*)', text.strip())
+    if not match:
+        raise ValueError(f"无效的通道：{text}")
+    try:
+        return match.group(1), float(match.group(2)) if match.group(2) else None
+    except ValueError:
+        raise ValueError(f"无效的通道：{text}") from None
+
+def iter_time_blocks(file_path, errors, chunk_bytes=CHUNK_BYTES):
+    """分块读取文件，依次返回(时间, 最后一列)
+
+    第一列为时间；只有一列的文件没有时间列，时间为None。已转换为列式存储的文件从内存映射数组读取，
+    否则解析文本，格式错误的行记入errors，连续错误达到上限时停止读取。
+    """
+    array = open_columnar(file_path)
+    if array is not None:
+        blocks = iter_columnar_blocks(array, chunk_bytes)
+    else:
+        def text_blocks():
+            width = None
+            with open(file_path, 'rb') as f:
+                for line_num, lines, _ in iter_byte_blocks(f, 1, chunk_bytes):
+                    block, width = parse_rows(lines, line_num, errors, width)
+                    if block.size:
+                        yield block
+                    if errors.aborted is not None:
+                        break
+        blocks = text_blocks()
+    for block in blocks:
+        yield (block[:, 0] if block.shape[1] > 1 else None), block[:, -1]
+
+class BlockBuffer:
+    """iter_time_blocks的读取缓冲区，只保存尚未连接的行"""
+
+    def __init__(self, blocks):
+        self.blocks = iter(blocks)
+        self.times = None
+        self.values = np.empty(0)
+        self.timed = None  # 是否有时间列，由首块决定
+        self.done = False  # 文件是否已读完
+        self.unmatched = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def fill(self):
+        """读取下一块追加到缓冲区，文件已读完时返回False"""
+        for times, values in self.blocks:
+            if not len(values):
+                continue
+            if self.timed is None:
+                self.timed = times is not None
+                self.times = np.empty(0)
+            self.values = np.concatenate((self.values, values))
+            if self.timed:
+                self.times = np.concatenate((self.times, times))
+            return True
+        self.done = True
+        return False
+
+    def horizon(self):
+        """缓冲区中最晚的时间，文件已读完时为无穷大（之后不会再有更晚的行）"""
+        return np.inf if self.done else self.times[-1]
+
+    def drop(self, count, matched=None):
+        """丢弃开头的count行，其中matched行已配对（默认全部），其余计入unmatched"""
+        self.values = self.values[count:]
+        if self.timed:
+            self.times = self.times[count:]
+        self.unmatched += count - (count if matched is None else matched)
+
+    def drain(self):
+        """丢弃缓冲区和文件中剩余的行，均记为未匹配"""
+        self.drop(len(self), matched=0)
+        while self.fill():
+            self.drop(len(self), matched=0)
+
+def match_nearest(left, right, tolerance):
+    """两侧都有时间列时连接缓冲区中可以确定的行，返回(左侧行号, 右侧行号, 左侧处理行数, 右侧处理行数)
+
+    截止时间为两侧最晚时间中较早者减去tolerance，早于截止时间的左侧行的候选行都已在右侧缓冲区中：
+    每行用searchsorted找到右侧时间最接近的一行，相差不超过tolerance时配对，
+    多行对应右侧同一行时只保留第一行。右侧丢弃到最后一个配对行为止，
+    以及早于截止时间超过tolerance、不可能再与之后的左侧行配对的行。
+    """
+    cutoff = min(left.horizon(), right.horizon()) - tolerance
+    count = int(np.searchsorted(left.times, cutoff, side='left'))
+    times = left.times[:count]
+    upper = np.searchsorted(right.times, times, side='left').clip(1, len(right) - 1)
+    lower = upper - 1
+    if len(right) == 1:
+        lower = upper = np.zeros(count, dtype=int)
+    nearer = np.abs(times - right.times[lower]) <= np.abs(right.times[upper] - times)
+    nearest = np.where(nearer, lower, upper)
+    left_rows = np.flatnonzero(np.abs(times - right.times[nearest]) <= tolerance)
+    right_rows = nearest[left_rows]
+    # 时间单调递增时配对的右侧行号不减，重复的行号相邻
+    first = np.ones(len(right_rows), dtype=bool)
+    first[1:] = right_rows[1:] != right_rows[:-1]
+    left_rows, right_rows = left_rows[first], right_rows[first]
+    consumed = int(np.searchsorted(right.times, cutoff - tolerance, side='left'))
+    if len(right_rows):
+        consumed = max(consumed, int(right_rows[-1]) + 1)
+    return left_rows, right_rows, count, consumed
+
+def iter_aligned(left, right, tolerance=DEFAULT_TOLERANCE):
+    """按时间归并连接两个BlockBuffer，依次返回(时间, 左侧数值, 右侧数值)
+
+    两侧时间（单调递增）相差不超过tolerance的行配对，每行最多配对一次，见match_nearest；
+    两侧时间步不同时每块同样向量化配对，无法配对的行计入unmatched。
+    任一侧没有时间列时按行序号对齐，时间取自另一侧，两侧都没有时为行序号。
+    """
+    row = 0
+    while (len(left) or left.fill()) and (len(right) or right.fill()):
+        if not (left.timed and right.timed):
+            k = min(len(left), len(right))
+            if left.timed:
+                times = left.times[:k]
+            elif right.timed:
+                times = right.times[:k]
+            else:
+                times = np.arange(row, row + k, dtype=float)
+            yield times, left.values[:k], right.values[:k]
+            row += k
+            left.drop(k)
+            right.drop(k)
+            continue
+        left_rows, right_rows, count, consumed = match_nearest(left, right, tolerance)
+        if len(left_rows):
+            yield left.times[left_rows], left.values[left_rows], right.values[right_rows]
+        if not count and not consumed:
+            # 缓冲区中的行还不能确定，读取截止时间较早一侧的下一块
+            (left if left.horizon() <= right.horizon() else right).fill()
+            continue
+        left.drop(count, len(left_rows))
+        right.drop(consumed, len(right_rows))
+    left.drain()
+    right.drain()
+
+def join_record(task):
+    """进程池工作函数：连接一个记录的位移和加速度文件并计算派生量
+
+    task为(record, disp_path, acc_path, specs, tolerance, limits)，
+    返回(record, {派生量: 值或None}, {文件路径: LineErrors}, (配对行数, 位移未配对行数, 加速度未配对行数))。
+    """
+    record, disp_path, acc_path, specs, tolerance, limits = task
+    quantities = {spec: make_quantity(spec) for spec in specs}
+    errors = {disp_path: LineErrors(limits), acc_path: LineErrors(limits)}
+    disp = BlockBuffer(iter_time_blocks(disp_path, errors[disp_path]))
+    acc = BlockBuffer(iter_time_blocks(acc_path, errors[acc_path]))
+    matched = 0
+    try:
+        for times, disp_values, acc_values in iter_aligned(disp, acc, tolerance):
+            for quantity in quantities.values():
+                quantity.update(times, disp_values, acc_values)
+            matched += len(times)
+    except Exception as e:
+        print(f"处理记录 B{record} 时出错: {str(e)}")
+        return record, {spec: None for spec in specs}, errors, (matched, 0, 0)
+    if any(file_errors.aborted is not None for file_errors in errors.values()):
+        values = {spec: None for spec in specs}
+    else:
+        values = {spec: quantity.result() for spec, quantity in quantities.items()}
+    values = {spec: None if value is None else float(value) for spec, value in values.items()}
+    errors = {path: file_errors for path, file_errors in errors.items() if file_errors}
+    return record, values, errors, (matched, disp.unmatched, acc.unmatched)
+
+def list_record_pairs(index, disp=DEFAULT_DISP, acc=DEFAULT_ACC, specimen=None, load=None):
+    """按记录配对两个通道的文件，返回([(record, disp_path, acc_path)], 缺少某一通道的文件路径列表)"""
+    sides = []
+    for channel in (disp, acc):
+        name, position = parse_channel(channel)
+        entries = index.query(channel=name, specimen=specimen, load=load)
+        sides.append({(e.specimen, e.record, e.load): e.path for e in entries
+                      if e.position == position})
+    pairs = [(key[1], path, sides[1][key]) for key, path in sides[0].items() if key in sides[1]]
+    missing = [path for side, other in ((sides[0], sides[1]), (sides[1], sides[0]))
+               for key, path in side.items() if key not in other]
+    return sorted(pairs, key=lambda pair: int(pair[0])), missing
+
+def join_folder(folder_path, output_dir, executor=None, template=DEFAULT_TEMPLATE,
+                disp=DEFAULT_DISP, acc=DEFAULT_ACC, specs=DEFAULT_QUANTITIES,
+                tolerance=DEFAULT_TOLERANCE, limits=DEFAULT_LIMITS, specimen=None, load=None,
+                output=DEFAULT_OUTPUT):
+    """连接文件夹中每个记录的两个通道并写出派生量表格，返回(结果文件路径列表, 错误日志路径, 缺少配对的文件)
+
+    [文件夹名]_derived_results.txt每个派生量一行、每个记录一列（quantity\\a），
+    [文件夹名]_join_counts.txt为每个记录的配对行数和两侧未配对的行数；没有可配对的记录时返回(None, None, missing)。
+    """
+    folder_name = os.path.basename(os.path.normpath(folder_path))
+    pairs, missing = list_record_pairs(FolderIndex(folder_path, template), disp, acc,
+                                       specimen, load)
+    if not pairs:
+        return None, None, missing
+    tasks = [(record, disp_path, acc_path, tuple(specs), tolerance, limits)
+             for record, disp_path, acc_path in pairs]
+    # map按提交顺序返回结果，输出与串行时一致
+    results = list(executor.map(join_record, tasks) if executor else map(join_record, tasks))
+
+    records = [f"B{record}" for record, *_ in results]
+    values = [[result[1][spec] for result in results] for spec in specs]
+    text = [["error" if value is None else str(value) for value in row] for row in values]
+    counts = np.array([result[3] for result in results], dtype=float).T
+    writer = ResultsWriter.from_options(output_dir, f"{folder_name}_derived_results", output)
+    writer.add(f"{folder_name}_derived_results", specs, records,
+               [[np.nan if value is None else value for value in row] for row in values],
+               text, corner="quantity\\a")
+    writer.add(f"{folder_name}_join_counts", ("matched", f"unmatched_{disp}", f"unmatched_{acc}"),
+               records, counts, counts.astype(int).astype(str), corner="rows\\a", keep_text=True)
+    output_paths = writer.write()
+
+    all_errors = {}
+    for result in results:
+        all_errors.update(result[2])
+    return output_paths, write_error_log(output_dir, folder_name, all_errors), missing
+
+def build_parser():
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        description="按时间逐块归并连接每个记录的位移和加速度文件，计算位移角、峰值位移时刻的加速度、耗能等派生量")
+    parser.add_argument("folders", nargs="+", help="包含disp和acc101文件的输入文件夹")
+    parser.add_argument("-o", "--output-dir", required=True, help="输出文件夹")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE,
+                        help="文件名模板（默认：%(default)s）")
+    parser.add_argument("--disp", default=DEFAULT_DISP, help="位移通道（默认：%(default)s）")
+    parser.add_argument("--acc", default=DEFAULT_ACC,
+                        help="加速度通道，通道名后可带位置（默认：%(default)s）")
+    parser.add_argument("--specimen", help="只处理指定试件，如S2")
+    parser.add_argument("--load", help="只处理指定轴压，如8.5")
+    parser.add_argument("--quantities", default=",".join(DEFAULT_QUANTITIES),
+                        help="逗号分隔的派生量，可选drift[:高度]、residual_drift[:高度]、"
+                             "acc_at_peak_disp、peak_acc、energy[:质量]（默认：%(default)s）")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="两个文件的时间相差不超过该值时视为同一时刻（默认：%(default)s）")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="并行进程数，1表示串行（默认：CPU核数）")
+    parser.add_argument("--max-error-lines", type=int, default=DEFAULT_LIMITS.max_lines,
+                        help="每个文件在错误日志中最多列出的错误行数，0表示不限"
+                             "（默认：%(default)s）")
+    parser.add_argument("--abort-after", type=int, default=None,
+                        help="连续出现该数量的错误行时放弃该记录，结果记为error（默认：不放弃）")
+    parser.add_argument("--formats", default=",".join(DEFAULT_OUTPUT.formats),
+                        help=f"逗号分隔的输出格式，可选{'、'.join(FORMATS)}（默认：%(default)s）")
+    parser.add_argument("--precision", type=int, default=None,
+                        help="文本表格保留的小数位数（默认：原样输出）")
+    return parser
+
+def main(argv=None):
+    """命令行入口，返回退出码：0成功，1有文件夹处理失败，2参数错误"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        compile_template(args.template)
+        parse_channel(args.disp)
+        parse_channel(args.acc)
+    except (re.error, ValueError) as e:
+        parser.error(str(e))
+    specs = tuple(spec.strip() for spec in args.quantities.split(",") if spec.strip())
+    try:
+        for spec in specs:
+            make_quantity(spec)
+    except ValueError as e:
+        parser.error(str(e))
+    if not specs:
+        parser.error("至少需要一个派生量")
+    if args.tolerance < 0:
+        parser.error("时间容差不能为负数")
+    if args.workers is not None and args.workers < 1:
+        parser.error("并行进程数必须为正整数")
+    if args.max_error_lines < 0:
+        parser.error("错误行上限不能为负数")
+    if args.abort_after is not None and args.abort_after < 1:
+        parser.error("连续错误行数必须为正整数")
+    formats = tuple(fmt.strip() for fmt in args.formats.split(",") if fmt.strip())
+    try:
+        check_formats(formats)
+    except ValueError as e:
+        parser.error(str(e))
+    if not formats:
+        parser.error("至少需要一种输出格式")
+    if args.precision is not None and args.precision < 0:
+        parser.error("小数位数不能为负数")
+    if not os.path.isdir(args.output_dir):
+        parser.error(f"输出文件夹不存在：{args.output_dir}")
+
+    limits = ErrorLimits(args.max_error_lines or None, args.abort_after)
+    output = OutputOptions(formats, args.precision)
+    workers = args.workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    failures = 0
+    try:
+        for folder_path in args.folders:
+            folder_name = os.path.basename(os.path.normpath(folder_path))
+            try:
+                output_paths, log_path, missing = join_folder(
+                    folder_path, args.output_dir, executor, args.template, args.disp,
+                    args.acc, specs, args.tolerance, limits, args.specimen, args.load, output)
+            except Exception as e:
+                print(f"处理文件夹 {folder_name} 时出错：{str(e)}", file=sys.stderr)
+                failures += 1
+                continue
+            for path in missing:
+                print(f"没有可配对的文件，已跳过：{os.path.basename(path)}", file=sys.stderr)
+            if output_paths is None:
+                print(f"文件夹 {folder_name} 中没有可配对的{args.disp}和{args.acc}文件",
+                      file=sys.stderr)
+                failures += 1
+                continue
+            for output_path in output_paths:
+                print(f"结果已保存到：{output_path}")
+            if log_path:
+                print(f"错误日志已保存到：{log_path}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # PyInstaller打包后子进程需要
+    sys.exit(main())
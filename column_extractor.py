@@ -1,52 +1,322 @@
 import sys
 import os
-import tkinter as tk
-from tkinter import filedialog, messagebox
 
-def extract_column(input_file, output_file, column_num):
+# 列式存储的清单位置，与recorder_store.STORE_DIRNAME/MANIFEST_FILENAME一致
+COLUMNAR_MANIFEST = os.path.join(".columnar", "manifest.json")
+
+def open_columnar(input_file):
+    """尝试以内存映射打开已转换的列式数组，不可用时返回None
+
+    文件夹未转换（没有清单）时直接返回，不导入NumPy。
+    """
+    folder_path = os.path.dirname(os.path.abspath(input_file))
+    if not os.path.exists(os.path.join(folder_path, COLUMNAR_MANIFEST)):
+        return None
     try:
-        column_index = column_num - 1  # 转换为从0开始的索引
-        with open(input_file, 'r') as f_in, open(output_file, 'w') as f_out:
-            for line_num, line in enumerate(f_in, 1):
-                line = line.strip()
-                if line:
-                    columns = line.split()
-                    if len(columns) >= column_num:
-                        f_out.write(columns[column_index] + '\n')
+        from recorder_store import open_columnar as _open_columnar
+    except ImportError:  # 未安装NumPy时只使用文本解析
+        return None
+    return _open_columnar(input_file)
+
+# 每次从输入文件读取的字节数（按整行切分），以及内存映射数组每次写出的行数
+READ_HINT = 4 * 1024 * 1024
+ARRAY_BLOCK_ROWS = 65536
+# 降采样导出的默认目标点数（每列）
+DEFAULT_POINTS = 2000
+
+def parse_column_spec(spec):
+    """解析列号描述：如"2"、"1,3"、"2-4"或"all"，返回列号列表或"all"
+
+    格式无效或列号小于1时抛出ValueError。
+    """
+    spec = spec.strip().lower()
+    if spec == "all":
+        return "all"
+    columns = []
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+            if start > end:
+                raise ValueError(f"无效的列号范围：{part}")
+            columns.extend(range(start, end + 1))
+        else:
+            columns.append(int(part))
+    if not columns or min(columns) < 1:
+        raise ValueError(f"无效的列号：{spec}")
+    return sorted(set(columns))
+
+def column_output_path(output_dir, input_file, column_num):
+    """自动生成的输出文件名：[输入文件名]_column_[列号].txt"""
+    input_filename = os.path.basename(input_file)
+    return os.path.join(output_dir, f"{os.path.splitext(input_filename)[0]}_column_{column_num}.txt")
+
+def extract_columns(input_file, columns, output_path_for):
+    """读取一次输入文件，同时提取多列，每列写入output_path_for(列号)对应的文件
+
+    columns为列号列表或"all"（按首个非空行的列数）。请求的列号超过首个非空行的列数时
+    抛出ValueError且不写出任何文件；之后列数不足的行写入"error"。返回{列号: 输出路径}。
+    """
+    # 已转换为列式存储的文件直接从内存映射数组写出
+    array = open_columnar(input_file)
+    if array is not None:
+        max_columns = array.shape[1]
+        columns = list(range(1, max_columns + 1)) if columns == "all" else columns
+        if columns and max(columns) > max_columns:
+            raise ValueError(f"最大列数{max_columns}")
+        outputs = {n: output_path_for(n) for n in columns}
+        for column_num, output_path in outputs.items():
+            with open(output_path, 'w') as f_out:
+                for start in range(0, array.shape[0], ARRAY_BLOCK_ROWS):
+                    block = array[start:start + ARRAY_BLOCK_ROWS, column_num - 1]
+                    if block.dtype.itemsize == 8:
+                        values = (repr(v) for v in block.tolist())
                     else:
-                        f_out.write("error\n")
-        return True
+                        # 按存储精度输出最短表示（如float32），与文本中的原值一致
+                        values = (str(v) for v in block)
+                    f_out.write(''.join(f"{v}\n" for v in values))
+        return outputs
+
+    outputs = {}
+    files = []
+    try:
+        with open(input_file, 'r') as f_in:
+            indices = None
+            while True:
+                lines = f_in.readlines(READ_HINT)
+                if not lines:
+                    break
+                if indices is None:
+                    # 由首个非空行确定列数，然后才创建输出文件
+                    first = next((line.split() for line in lines if line.strip()), None)
+                    if first is None:
+                        continue
+                    max_columns = len(first)
+                    if columns == "all":
+                        columns = list(range(1, max_columns + 1))
+                    if max(columns) > max_columns:
+                        raise ValueError(f"最大列数{max_columns}")
+                    indices = [n - 1 for n in columns]  # 转换为从0开始的索引
+                    for column_num in columns:
+                        outputs[column_num] = output_path_for(column_num)
+                        files.append(open(outputs[column_num], 'w'))
+                
+                # 先在内存中按列汇总一块数据，再整块写出
+                buffers = [[] for _ in indices]
+                for line in lines:
+                    parts = line.split()
+                    if parts:
+                        count = len(parts)
+                        for buffer, index in zip(buffers, indices):
+                            buffer.append(parts[index] if index < count else "error")
+                for f_out, buffer in zip(files, buffers):
+                    if buffer:
+                        f_out.write('\n'.join(buffer) + '\n')
+    finally:
+        for f_out in files:
+            f_out.close()
+    if indices is None and columns != "all":
+        # 输入文件没有非空行，与单列提取一致地写出空文件
+        for column_num in columns:
+            outputs[column_num] = output_path_for(column_num)
+            open(outputs[column_num], 'w').close()
+    return outputs
+
+class MinMaxDecimator:
+    """流式min/max降采样：每bucket行为一个桶，保留桶内各列最小值和最大值所在的两行
+
+    两点按原有顺序排列，最小值和最大值在同一行时只保留一点，因此全局峰值不会丢失。
+    每次update处理一整块数据，不足一个桶的行留到下一块。
+    """
+
+    def __init__(self, bucket, column_count):
+        self.bucket = bucket
+        self.pending = None  # 不足一个桶的(时间, 数值)
+        self.times = [[] for _ in range(column_count)]
+        self.values = [[] for _ in range(column_count)]
+
+    def update(self, times, values):
+        """加入一块数据：times为一维时间数组，values为(行数 × 列数)数组"""
+        import numpy as np
+        if self.pending is not None:
+            times = np.concatenate([self.pending[0], times])
+            values = np.concatenate([self.pending[1], values])
+        full = len(times) // self.bucket * self.bucket
+        self.emit(times[:full], values[:full], self.bucket)
+        self.pending = (times[full:], values[full:])
+
+    def finish(self):
+        """处理最后不足一个桶的行，返回每列的(时间列表, 数值列表)"""
+        if self.pending is not None and len(self.pending[0]):
+            self.emit(self.pending[0], self.pending[1], len(self.pending[0]))
+            self.pending = None
+        return list(zip(self.times, self.values))
+
+    def emit(self, times, values, bucket):
+        import numpy as np
+        if not len(times):
+            return
+        count = len(times) // bucket
+        buckets = values.reshape(count, bucket, values.shape[1])
+        low = buckets.argmin(axis=1)
+        high = buckets.argmax(axis=1)
+        base = (np.arange(count) * bucket)[:, None]
+        # 每个桶两行(桶数 × 2 × 列数)，先出现的在前
+        rows = np.stack([np.minimum(low, high) + base, np.maximum(low, high) + base], axis=1)
+        keep = np.ones(rows.shape, dtype=bool)
+        keep[:, 1, :] = low != high
+        for j in range(values.shape[1]):
+            index = rows[:, :, j][keep[:, :, j]]
+            self.times[j].extend(times[index].tolist())
+            self.values[j].extend(values[index, j].tolist())
+
+def decimate_columns(input_file, columns, output_path_for, points=DEFAULT_POINTS,
+                     chunk_bytes=READ_HINT):
+    """分块读取输入文件，按min/max降采样写出所选列，每列约points个点
+
+    第一列为时间，每个输出文件两列：时间 数值；只有一列的文件以行序号（从0开始）作为时间。
+    columns为列号列表或"all"（时间列以外的全部列）。行数按首块的平均行长由文件大小估计，
+    不足points行时原样保留全部行；格式错误的行被跳过。返回{列号: 输出路径}。
+    """
+    import numpy as np
+    from line_errors import LineErrors
+    from recorder_store import iter_byte_blocks
+    from reduction_engine import iter_columnar_blocks, parse_rows
+
+    array = open_columnar(input_file)
+    if array is not None:
+        row_count = array.shape[0]
+        blocks = iter_columnar_blocks(array, chunk_bytes)
+    else:
+        f_in = open(input_file, 'rb')
+        row_count = None
+
+        def text_blocks():
+            width = None
+            errors = LineErrors()
+            with f_in:
+                for line_num, lines, _ in iter_byte_blocks(f_in, 1, chunk_bytes):
+                    block, width = parse_rows(lines, line_num, errors, width)
+                    if block.size:
+                        yield block
+        blocks = text_blocks()
+
+    decimator = None
+    row = 0
+    for block in blocks:
+        if decimator is None:
+            width = block.shape[1]
+            if columns == "all":
+                columns = list(range(2, width + 1)) if width > 1 else [1]
+            if max(columns) > width:
+                raise ValueError(f"最大列数{width}")
+            if row_count is None:
+                # 由首块每行的平均字节数估计总行数
+                row_count = os.path.getsize(input_file) * block.shape[0] // max(1, f_in.tell())
+            bucket = max(1, -(-row_count // max(1, points // 2)))
+            decimator = MinMaxDecimator(bucket, len(columns))
+            indices = [n - 1 for n in columns]
+        times = block[:, 0] if width > 1 else np.arange(row, row + block.shape[0], dtype=float)
+        decimator.update(times, block[:, indices])
+        row += block.shape[0]
+
+    outputs = {}
+    if decimator is None:
+        # 没有有效行，与列提取一致地写出空文件
+        for column_num in ([] if columns == "all" else columns):
+            outputs[column_num] = output_path_for(column_num)
+            open(outputs[column_num], 'w').close()
+        return outputs
+    for column_num, (times, values) in zip(columns, decimator.finish()):
+        outputs[column_num] = output_path_for(column_num)
+        with open(outputs[column_num], 'w') as f_out:
+            f_out.write(''.join(f"{t!r} {v!r}\n" for t, v in zip(times, values)))
+    return outputs
+
+def extract_file_job(job):
+    """进程池工作函数：job为(input_file, columns, output_dir, points)，返回(input_file, 输出路径或None, 错误信息)
+
+    points为None时提取全部行，否则按min/max降采样为约points个点，见decimate_columns。
+    """
+    input_file, columns, output_dir, points = job
+    output_path_for = lambda n: column_output_path(output_dir, input_file, n)
+    try:
+        if points is None:
+            outputs = extract_columns(input_file, columns, output_path_for)
+        else:
+            outputs = decimate_columns(input_file, columns, output_path_for, points)
+        return input_file, outputs, None
     except Exception as e:
-        messagebox.showerror("错误", f"处理过程中发生错误: {str(e)}")
-        return False
+        return input_file, None, str(e)
+
+def extract_many(input_files, columns, output_dir, workers=None, points=None):
+    """并行处理多个输入文件，按输入顺序返回[(input_file, {列号: 输出路径}或None, 错误信息)]"""
+    jobs = [(input_file, columns, output_dir, points) for input_file in input_files]
+    if workers is None:
+        workers = min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1:
+        return [extract_file_job(job) for job in jobs]
+    # 进程池只在并行处理时导入，单文件和命令行模式不加载multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(extract_file_job, jobs))
+
+def existing_outputs(output_dir, input_file, columns):
+    """返回将被覆盖的已有输出文件名；columns为"all"时检查所有[输入文件名]_column_*.txt"""
+    if columns == "all":
+        prefix = f"{os.path.splitext(os.path.basename(input_file))[0]}_column_"
+        return sorted(name for name in os.listdir(output_dir)
+                      if name.startswith(prefix) and name.endswith(".txt"))
+    return [os.path.basename(column_output_path(output_dir, input_file, n))
+            for n in columns
+            if os.path.exists(column_output_path(output_dir, input_file, n))]
 
 def gui_mode():
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    
     root = tk.Tk()
     root.withdraw()
 
     # 创建列号选择对话框
     column_dialog = tk.Toplevel()
     column_dialog.title("列号设置")
-    column_dialog.geometry("300x150")
+    column_dialog.geometry("340x240")
     
-    tk.Label(column_dialog, text="请输入要提取的列号（从1开始计数）:").pack(pady=10)
+    tk.Label(column_dialog, text="请输入要提取的列号（从1开始计数）:\n"
+             "多列用逗号或范围表示，如1,3或2-4，全部列输入all").pack(pady=10)
     column_entry = tk.Entry(column_dialog)
     column_entry.pack(pady=5)
     column_entry.insert(0, "2")  # 默认第二列
     
+    tk.Label(column_dialog, text="降采样点数（用于绘图，保留峰值）:\n"
+             "留空则输出全部行").pack(pady=5)
+    points_entry = tk.Entry(column_dialog)
+    points_entry.pack(pady=5)
+    
+    def validate_points():
+        text = points_entry.get().strip()
+        if not text:
+            return None
+        if not text.isdigit() or int(text) < 2:
+            raise ValueError(text)
+        return int(text)
+    
     def validate_column():
         try:
-            column_num = int(column_entry.get())
-            if column_num < 1:
-                raise ValueError
-            return column_num
+            return parse_column_spec(column_entry.get())
         except ValueError:
-            tk.messagebox.showerror("错误", "请输入有效的正整数列号")
+            messagebox.showerror("错误", "请输入有效的正整数列号、列号列表或all")
             return None
     
     def on_confirm():
-        column_num = validate_column()
-        if column_num is None:
+        columns = validate_column()
+        if columns is None:
+            return
+        try:
+            points = validate_points()
+        except ValueError:
+            messagebox.showerror("错误", "降采样点数必须为不小于2的整数")
             return
             
         column_dialog.destroy()
@@ -67,41 +337,29 @@ def gui_mode():
         )
         if not output_dir:
             return
-            
-        success_count = 0
-        error_count = 0
-        error_messages = []
         
+        # 检查输出文件是否已存在
+        selected_files = []
         for input_file in input_files:
-            try:
-                input_filename = os.path.basename(input_file)
-                # 预检查文件列数
-                with open(input_file, 'r') as f:
-                    first_line = f.readline().strip()
-                    max_columns = len(first_line.split()) if first_line else 0
-                if column_num > max_columns:
-                    error_count += 1
-                    error_messages.append(f"{input_filename}: 最大列数{max_columns}")
+            existing = existing_outputs(output_dir, input_file, columns)
+            if existing:
+                names = existing[0] if len(existing) == 1 else f"{existing[0]} 等{len(existing)}个文件"
+                if not messagebox.askyesno("文件已存在",
+                    f"文件 {names} 已存在，是否覆盖？", parent=root):
                     continue
-                    
-                # 自动生成输出文件名
-                output_filename = f"{os.path.splitext(input_filename)[0]}_column_{column_num}.txt"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                # 检查文件是否已存在
-                if os.path.exists(output_path):
-                    if not messagebox.askyesno("文件已存在", 
-                        f"文件 {output_filename} 已存在，是否覆盖？", parent=root):
-                        continue
-                        
-                if extract_column(input_file, output_path, column_num):
-                    success_count += 1
-                else:
-                    error_count += 1
-                    error_messages.append(f"{input_filename}: 处理失败")
-            except Exception as e:
+            selected_files.append(input_file)
+        
+        # 每个输入文件只读取一次，多个文件并行处理
+        success_count = 0
+        error_count = 0
+        error_messages = []
+        for input_file, outputs, error in extract_many(selected_files, columns, output_dir,
+                                                         points=points):
+            if error is None:
+                success_count += 1
+            else:
                 error_count += 1
-                error_messages.append(f"{input_filename}: {str(e)}")
+                error_messages.append(f"{os.path.basename(input_file)}: {error}")
         
         # 显示汇总结果
         result_message = f"处理完成！\n成功: {success_count} 个文件\n失败: {error_count} 个文件"
@@ -116,19 +374,54 @@ def gui_mode():
     tk.Button(column_dialog, text="确认", command=on_confirm).pack(pady=10)
     column_dialog.mainloop()
 
-if __name__ == "__main__":
-    if len(sys.argv) == 4:
-        # 新版命令行模式
+def main(argv=None):
+    """入口：参数为[列号] [输入文件] [输出文件]时按命令行模式运行，否则打开图形界面，返回退出码"""
+    argv = sys.argv[1:] if argv is None else argv
+    usage = ("Usage: python column_extractor.py [column_spec] [input_file] [output_file]"
+             " [--points N]\n"
+             "  column_spec: 2 | 1,3 | 2-4 | all; 多列时输出为[output_file]_column_[列号]\n"
+             "  --points N: 按min/max降采样为约N个点（时间 数值两列），保留峰值")
+    if argv and argv[0] in ('-h', '--help'):
+        print(usage)
+        return 0
+    points = None
+    if "--points" in argv:
+        i = argv.index("--points")
         try:
-            column_num = int(sys.argv[1])
-            input_file = sys.argv[2]
-            output_file = sys.argv[3]
-            if column_num < 1:
-                raise ValueError
-            extract_column(input_file, output_file, column_num)
-        except (ValueError, IndexError):
-            print("Usage: python column_extractor.py [column_number] [input_file] [output_file]")
-            sys.exit(1)
-    else:
+            points = int(argv[i + 1])
+        except (IndexError, ValueError):
+            points = 0
+        if points < 2:
+            print(usage)
+            return 1
+        argv = argv[:i] + argv[i + 2:]
+    if len(argv) != 3:
         # GUI模式
         gui_mode()
+        return 0
+    # 新版命令行模式
+    try:
+        columns = parse_column_spec(argv[0])
+        input_file = argv[1]
+        output_file = argv[2]
+    except (ValueError, IndexError):
+        print(usage)
+        return 1
+    # 单列时直接写入输出文件，多列时为[输出文件名]_column_[列号]；出错时输出到标准错误，不弹出窗口
+    stem, ext = os.path.splitext(output_file)
+    single = columns != "all" and len(columns) == 1
+    output_path_for = lambda n: output_file if single else f"{stem}_column_{n}{ext}"
+    try:
+        if points is not None:
+            decimate_columns(input_file, columns, output_path_for, points)
+        else:
+            extract_columns(input_file, columns, output_path_for)
+    except (OSError, ValueError) as e:
+        print(f"处理过程中发生错误: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # PyInstaller打包后子进程需要
+    sys.exit(main())
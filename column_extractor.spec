@@ -10,6 +10,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
+    # NumPy只在降采样导出或读取列式存储时才导入，不影响启动
     excludes=[],
     noarchive=False,
     optimize=0,
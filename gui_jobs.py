@@ -0,0 +1,169 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import tkinter as tk
+from tkinter import ttk
+from run_report import RunCancelled, format_progress
+
+# 同时运行的任务数，其余任务排队等待
+MAX_CONCURRENT_JOBS = 2
+# 主循环轮询消息队列的间隔（毫秒）
+POLL_INTERVAL_MS = 100
+
+# 消息类型对应的任务状态
+STATUS = {
+    'queued': "排队中",
+    'start': "运行中",
+    'done': "已完成",
+    'error': "出错",
+    'cancelled': "已取消",
+}
+
+class Job:
+    """一个后台任务，func在后台线程中通过post向界面发送消息"""
+
+    def __init__(self, job_id, name, messages):
+        self.id = job_id
+        self.name = name
+        self.status = STATUS['queued']
+        self.cancel_event = threading.Event()
+        self.messages = messages
+
+    def post(self, kind, payload=None):
+        """发送消息，由JobRunner在主循环中分发给界面"""
+        self.messages.put((self, kind, payload))
+
+    def cancel(self):
+        """请求取消，任务在下一次检查时停止"""
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        """已请求取消时抛出RunCancelled，供任务函数在循环中调用"""
+        if self.cancel_event.is_set():
+            raise RunCancelled()
+
+    @property
+    def active(self):
+        return self.status in (STATUS['queued'], STATUS['start'])
+
+class JobRunner:
+    """在线程池中运行任务，通过队列和root.after把进度和结果交回Tk主循环
+
+    handler(job, kind, payload)在主线程中调用，kind为：
+    "queued"、"start"、"progress"（进度字典或文本）、"report"（(级别, 消息)）、
+    "done"（任务函数的返回值）、"error"（异常）、"cancelled"。
+    """
+
+    def __init__(self, root, handler, max_workers=MAX_CONCURRENT_JOBS):
+        self.root = root
+        self.handler = handler
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.messages = queue.Queue()
+        self.jobs = []
+        self.poll_id = root.after(POLL_INTERVAL_MS, self.poll)
+
+    def submit(self, name, func, *args, **kwargs):
+        """提交任务，func(job, *args, **kwargs)在后台线程中运行，返回Job"""
+        job = Job(len(self.jobs) + 1, name, self.messages)
+        self.jobs.append(job)
+        job.post("queued")
+        self.executor.submit(self.run_job, job, func, args, kwargs)
+        return job
+
+    def run_job(self, job, func, args, kwargs):
+        if job.cancel_event.is_set():
+            job.post("cancelled")
+            return
+        job.post("start")
+        try:
+            result = func(job, *args, **kwargs)
+        except RunCancelled:
+            job.post("cancelled")
+        except Exception as e:
+            job.post("error", e)
+        else:
+            job.post("done", result)
+
+    def poll(self):
+        """分发队列中的全部消息，然后重新安排下一次轮询"""
+        try:
+            while True:
+                try:
+                    job, kind, payload = self.messages.get_nowait()
+                except queue.Empty:
+                    break
+                job.status = STATUS.get(kind, job.status)
+                self.handler(job, kind, payload)
+        finally:
+            self.poll_id = self.root.after(POLL_INTERVAL_MS, self.poll)
+
+    def active_jobs(self):
+        """排队中或运行中的任务"""
+        return [job for job in self.jobs if job.active]
+
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def shutdown(self):
+        """取消全部任务并等待后台线程结束，关闭窗口前调用"""
+        self.cancel_all()
+        self.root.after_cancel(self.poll_id)
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+class JobPanel(ttk.LabelFrame):
+    """任务列表：显示每个任务的状态和进度，可取消所选任务
+
+    下方的进度条显示所选任务（未选择时为最近报告进度的任务）已完成的文件比例。
+    """
+
+    def __init__(self, parent, runner=None):
+        super().__init__(parent, text="任务", padding="5")
+        self.runner = runner
+        self.tree = ttk.Treeview(self, columns=("name", "status", "progress"),
+                                 show="headings", height=5)
+        self.tree.heading("name", text="任务")
+        self.tree.heading("status", text="状态")
+        self.tree.heading("progress", text="进度")
+        self.tree.column("name", width=200)
+        self.tree.column("status", width=60, anchor="center")
+        self.tree.column("progress", width=400)
+        self.tree.pack(fill="both", expand=True)
+        self.tree.bind("<<TreeviewSelect>>", lambda event: self.show_fraction())
+        self.fractions = {}  # {任务行iid: 已完成比例}
+        self.latest = None  # 最近报告进度的任务行
+        self.bar = ttk.Progressbar(self, mode="determinate", maximum=1.0)
+        self.bar.pack(fill="x", pady=(5, 0))
+        ttk.Button(self, text="取消所选任务", command=self.cancel_selected).pack(pady=5)
+
+    def update_job(self, job, kind, payload=None):
+        """根据任务消息更新列表中的一行"""
+        iid = str(job.id)
+        if not self.tree.exists(iid):
+            self.tree.insert("", tk.END, iid=iid, values=(job.name, job.status, ""))
+        progress = self.tree.set(iid, "progress")
+        if kind == "progress":
+            progress = format_progress(payload) if isinstance(payload, dict) else str(payload)
+            if isinstance(payload, dict) and payload.get('total_files'):
+                self.fractions[iid] = payload['done_files'] / payload['total_files']
+                self.latest = iid
+        elif kind == "error":
+            progress = str(payload)
+        elif kind == "done":
+            self.fractions[iid] = 1.0
+        self.tree.item(iid, values=(job.name, job.status, progress))
+        self.show_fraction()
+
+    def show_fraction(self):
+        """进度条显示所选任务或最近报告进度的任务"""
+        selection = self.tree.selection()
+        iid = selection[0] if selection else self.latest
+        self.bar['value'] = self.fractions.get(iid, 0.0)
+
+    def cancel_selected(self):
+        if self.runner is None:
+            return
+        selected = {int(iid) for iid in self.tree.selection()}
+        for job in self.runner.jobs:
+            if job.id in selected and job.active:
+                job.cancel()
@@ -0,0 +1,124 @@
+import os
+from collections import namedtuple
+from datetime import datetime
+
+# 每个文件默认最多保存的错误行数，超出的部分只计数
+MAX_ERROR_LINES = 1000
+
+# 错误行的处理上限：
+# max_lines为每个文件最多保存的错误行数（None为不限）；
+# abort_after为连续错误行数达到该值时放弃该文件（None为从不放弃）
+ErrorLimits = namedtuple('ErrorLimits', ['max_lines', 'abort_after'])
+DEFAULT_LIMITS = ErrorLimits(MAX_ERROR_LINES, None)
+
+class LineErrors(list):
+    """单个文件的错误行，列表中只保存前max_lines个(行号, 内容)
+
+    total为错误行总数；连续错误行达到abort_after时aborted记为当时的行号，
+    调用方应随即停止读取该文件。
+    """
+
+    def __init__(self, limits=DEFAULT_LIMITS, items=(), total=None, aborted=None):
+        super().__init__(tuple(item) for item in items)
+        self.limits = limits
+        self.total = len(self) if total is None else total
+        self.aborted = aborted
+        self.consecutive = 0
+
+    def add(self, line_num, line):
+        """登记一个错误行"""
+        self.total += 1
+        if self.limits.max_lines is None or len(self) < self.limits.max_lines:
+            self.append((line_num, line.strip()))
+        self.consecutive += 1
+        abort_after = self.limits.abort_after
+        if abort_after is not None and self.consecutive >= abort_after:
+            self.aborted = line_num
+
+    def good(self):
+        """遇到有效行，重置连续错误计数"""
+        self.consecutive = 0
+
+    @property
+    def omitted(self):
+        """超出上限未保存的错误行数"""
+        return self.total - len(self)
+
+def errors_state(errors):
+    """LineErrors的运行状态（可写为JSON），用于追加读取的检查点，见restore_errors"""
+    return {'lines': list(errors), 'total': errors.total, 'aborted': errors.aborted,
+            'consecutive': errors.consecutive}
+
+def restore_errors(state, limits=DEFAULT_LIMITS):
+    """由errors_state的结果恢复LineErrors"""
+    errors = LineErrors(limits, state['lines'], state['total'], state['aborted'])
+    errors.consecutive = state['consecutive']
+    return errors
+
+def write_error_log(output_dir, folder_name, errors):
+    """写入错误日志，开头为各文件错误行数的汇总
+
+    errors为{文件路径: LineErrors}，超出上限未保存的错误行只在汇总中计数。
+    """
+    if errors:
+        log_filename = f"error_log_{folder_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        log_path = os.path.join(output_dir, log_filename)
+        with open(log_path, 'w', encoding='utf-8') as f:
+            f.write(f"错误日志 - {folder_name}\n")
+            f.write("=" * 50 + "\n\n")
+            
+            # 汇总
+            total = sum(file_errors.total for file_errors in errors.values())
+            f.write(f"共 {len(errors)} 个文件存在错误行，合计 {total} 行\n")
+            for file_path, file_errors in errors.items():
+                line = f"  {os.path.basename(file_path)}: {file_errors.total} 行"
+                if file_errors.aborted is not None:
+                    line += f"（连续错误，已在第 {file_errors.aborted} 行放弃该文件）"
+                f.write(line + "\n")
+            
+            for file_path, file_errors in errors.items():
+                if file_errors:
+                    f.write(f"\n文件: {os.path.basename(file_path)}\n")
+                    for line_num, line_content in file_errors:
+                        f.write(f"行 {line_num}: {line_content}\n")
+                    if file_errors.omitted:
+                        f.write(f"……另有 {file_errors.omitted} 行错误未列出\n")
+        return log_path
+    return None
+
+def limits_key(limits):
+    """错误上限的文本表示，用于缓存键"""
+    return f"{limits.max_lines}:{limits.abort_after}"
+
+def parse_lines(lines, first_line_num, parse_block, parse_line, errors):
+    """解析一块行，返回解析结果
+
+    先用parse_block(lines)整块解析，失败时对每个非空行调用parse_line(parts)逐行解析，
+    返回有效行结果的列表。两者无法解析时均应抛出ValueError。
+    错误行记入errors（LineErrors），errors.aborted被设置后立即停止。
+    """
+    try:
+        block = parse_block(lines)
+    except ValueError:
+        pass
+    else:
+        if len(block):
+            errors.good()
+        return block
+
+    # 块内存在格式错误的行，退回逐行解析
+    rows = []
+    for line_num, line in enumerate(lines, first_line_num):
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            rows.append(parse_line(parts))
+        except ValueError:
+            errors.add(line_num, line)
+            if errors.aborted is not None:
+                break
+            continue
+        if errors.consecutive:
+            errors.good()
+    return rows
@@ -0,0 +1,84 @@
+import sys
+
+# 合并后的入口：一个可执行文件包含全部工具，打包的运行时只需解压一次。
+# 每个命令只在被调用时导入对应模块，不使用的工具（及其NumPy、tkinter依赖）不会被加载。
+# 命令名: (模块, 命令行入口, 图形界面入口, 说明)
+COMMANDS = {
+    'barfiber': ('process_barfiber', 'main', 'process_folders', "barfiber文件最大绝对值处理"),
+    'results': ('process_results', None, 'main', "results处理（应变分布、最大应变）"),
+    'extract': ('column_extractor', 'main', 'gui_mode', "列提取"),
+    'store': ('recorder_store', 'main', None, "转换为列式存储"),
+    'aggregate': ('aggregate_results', 'main', None, "多文件夹results汇总"),
+    'join': ('channel_join', 'main', None, "位移与加速度按时间连接及派生量"),
+}
+
+def load_entry(command, gui=False):
+    """导入命令对应的模块，返回其命令行或图形界面入口函数，没有时返回None"""
+    module_name, cli, gui_name, _ = COMMANDS[command]
+    name = gui_name if gui else cli
+    if name is None:
+        return None
+    module = __import__(module_name)
+    return getattr(module, name)
+
+def run_command(command, argv):
+    """运行一个命令，argv为空时打开该工具的图形界面（有的话），返回退出码"""
+    if argv or COMMANDS[command][2] is None:
+        entry = load_entry(command)
+        if entry is None:
+            print(f"命令 {command} 没有命令行模式", file=sys.stderr)
+            return 2
+        return entry(argv) or 0
+    load_entry(command, gui=True)()
+    return 0
+
+def choose_command():
+    """启动窗口：选择要打开的工具，关闭窗口时返回None"""
+    import tkinter as tk
+    from tkinter import ttk
+
+    chosen = []
+    root = tk.Tk()
+    root.title("后处理工具")
+    frame = ttk.Frame(root, padding="10")
+    frame.pack(expand=True, fill="both")
+    ttk.Label(frame, text="请选择工具：").pack(pady=10)
+
+    def choose(command):
+        chosen.append(command)
+        root.destroy()
+
+    for command, (_, _, gui_name, description) in COMMANDS.items():
+        if gui_name is not None:
+            ttk.Button(frame, text=description,
+                       command=lambda c=command: choose(c)).pack(fill="x", pady=5)
+    root.mainloop()
+    return chosen[0] if chosen else None
+
+def usage():
+    lines = ["用法：postproc 命令 [参数 ...]，不带参数时打开工具选择窗口", "命令："]
+    lines += [f"  {command:<10}{description}"
+              for command, (_, _, _, description) in COMMANDS.items()]
+    lines.append("各命令不带参数时打开对应的图形界面，带参数时按命令行模式运行（-h查看参数）")
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        command = choose_command()
+        return run_command(command, []) if command else 0
+    command, argv = argv[0], argv[1:]
+    if command in ('-h', '--help'):
+        print(usage())
+        return 0
+    if command not in COMMANDS:
+        print(f"未知的命令：{command}\n{usage()}", file=sys.stderr)
+        return 2
+    return run_command(command, argv)
+
+if __name__ == "__main__":
+    if getattr(sys, 'frozen', False):
+        # PyInstaller打包后子进程需要，须在导入任何工具之前调用；未打包时无需导入multiprocessing
+        import multiprocessing
+        multiprocessing.freeze_support()
+    sys.exit(main())
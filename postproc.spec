@@ -0,0 +1,43 @@
+# -*- mode: python ; coding: utf-8 -*-
+
+
+a = Analysis(
+    ['postproc.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    # 各工具模块由postproc按命令名动态导入，需显式列出
+    hiddenimports=['process_barfiber', 'process_results', 'column_extractor', 'recorder_store',
+                   'aggregate_results', 'channel_join', 'results_session'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    # 各工具用不到的标准库和可能被连带收集的大型第三方库，减小需要解压的体积
+    excludes=['asyncio', 'email', 'http', 'xmlrpc', 'xml', 'unittest', 'doctest', 'pydoc',
+              'pdb', 'ftplib', 'lib2to3', 'matplotlib', 'pandas', 'scipy', 'IPython'],
+    noarchive=False,
+    optimize=1,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.datas,
+    [],
+    name='postproc',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    runtime_tmpdir=None,
+    # 控制台程序：命令行模式的输出、进度和退出码与直接用python运行一致
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
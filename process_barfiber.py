@@ -1,169 +1,1032 @@
 import os
 import re
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import numpy as np
+import warnings
+import sys
+import time
+import argparse
+import json
+import glob
+import hashlib
+import zlib
 from datetime import datetime
+from line_errors import (DEFAULT_LIMITS, ErrorLimits, LineErrors, errors_state, parse_lines,
+                         restore_errors, write_error_log)
+from recorder_index import DEFAULT_TEMPLATE, FolderIndex, compile_template
+from recorder_store import (CHUNK_BYTES, Checkpoint, iter_byte_blocks, open_columnar,
+                            prefix_hash, record_width, resume_point)
+from results_writer import (DEFAULT_OUTPUT, FORMATS, OutputOptions, ResultsWriter,
+                            check_formats)
+from run_report import RunCancelled, RunMonitor, terminal_progress
+# NumPy、归约缓存（SQLite）和进程池在处理文件夹时才导入（见各函数），
+# 不带参数打开图形界面时只加载界面所需的模块，窗口可以更快出现
 
-def process_file(file_path):
-    """处理单个文件，提取最后一列并计算最大绝对值"""
+# 默认处理的记录：barfiber通道的全部文件，可再按specimen/load筛选
+DEFAULT_SELECTION = {'channel': 'barfiber'}
+# 结果文件名不带通道名的通道，沿用[文件夹名]_results.txt
+DEFAULT_CHANNEL = 'barfiber'
+# 最大绝对值的放大系数
+DEFAULT_SCALE = 1000
+# 默认只计算最后一列的最大绝对值
+DEFAULT_STATS = ('maxabs',)
+# 监视模式检查文件夹的间隔（秒）
+WATCH_INTERVAL = 10
+# 文件大小和修改时间保持不变超过该秒数后视为写入完成
+WATCH_SETTLE = 60
+# 分片部分结果文件的格式版本，格式改变时递增
+PARTIAL_VERSION = 1
+
+def load_last_column(lines):
+    """整块解析最后一列，存在无法解析的行时抛出ValueError"""
+    import numpy as np
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # 全空块会触发空输入警告
+        return np.loadtxt(lines, usecols=-1, comments=None, ndmin=1)
+
+def parse_last_column(lines, first_line_num, errors):
+    """批量解析一块行的最后一列，失败时逐行解析并将错误行记入errors（LineErrors）"""
+    import numpy as np
+    values = parse_lines(lines, first_line_num, load_last_column,
+                         lambda parts: float(parts[-1]), errors)
+    return np.asarray(values, dtype=float)
+
+def columnar_max_abs(array, chunk_bytes=CHUNK_BYTES):
+    """分块计算内存映射数组最后一列的最大绝对值"""
+    import numpy as np
+    if array.shape[0] == 0 or array.shape[1] == 0:
+        return None
+    step = max(1, chunk_bytes // (array.shape[1] * array.itemsize))
+    max_abs = None
+    for start in range(0, array.shape[0], step):
+        block_max = np.abs(array[start:start + step, -1]).max()
+        if max_abs is None or block_max > max_abs:
+            max_abs = block_max
+    return max_abs
+
+def max_abs_state(max_abs, errors):
+    """process_file检查点中保存的归约状态（JSON文本）"""
+    return json.dumps({'max_abs': None if max_abs is None else float(max_abs),
+                       'errors': errors_state(errors)}, ensure_ascii=False)
+
+def process_file(file_path, chunk_bytes=CHUNK_BYTES, info=None, limits=DEFAULT_LIMITS,
+                 checkpoint=None):
+    """处理单个文件，提取最后一列并计算最大绝对值
+
+    返回(最大绝对值, 错误行)，错误行为LineErrors，最多保存limits.max_lines行；
+    连续错误行达到limits.abort_after时放弃该文件，最大绝对值返回None。
+    checkpoint为上次读取结束时的Checkpoint，文件只是追加了内容时从该处继续读取，
+    被截断或改写时重新完整读取。
+    info为字典时填入读取字节数、行数、解析和归约的耗时，以及本次读取结束时的新检查点；
+    从头完整读取文本文件时还填入内容的SHA-1（sha1），供缓存比较。
+    """
+    import numpy as np
+    if info is None:
+        info = {}
+    info.update(bytes=0, lines=0, parse_seconds=0.0, reduce_seconds=0.0)
+    errors = LineErrors(limits)
     try:
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
-            last_column = []
-            errors = []
-            for line_num, line in enumerate(lines, 1):
-                parts = line.strip().split()
-                if parts:  # 确保行不为空
-                    try:
-                        value = float(parts[-1])  # 转换最后一列为浮点数
-                        last_column.append(value)
-                    except (ValueError, IndexError):
-                        errors.append((line_num, line.strip()))
-                        continue
-            if last_column:
-                return max(abs(np.array(last_column))), errors
-            return None, errors
+        # 已转换为列式存储的文件直接读取内存映射数组，无需解析文本
+        array = open_columnar(file_path)
+        if array is not None:
+            start = time.perf_counter()
+            max_abs = columnar_max_abs(array, chunk_bytes)
+            info.update(bytes=array.nbytes, lines=array.shape[0],
+                        reduce_seconds=time.perf_counter() - start)
+            return max_abs, errors
+        
+        with open(file_path, 'rb') as f:
+            checkpoint = resume_point(f, checkpoint)
+            if checkpoint is None:
+                offset, lines_done, max_abs = 0, 0, None
+            else:
+                # 只读取检查点之后追加的部分
+                offset, lines_done = checkpoint.offset, checkpoint.lines
+                state = json.loads(checkpoint.state)
+                max_abs = state['max_abs']
+                errors = restore_errors(state['errors'], limits)
+                info['resumed_bytes'] = offset
+            f.seek(offset)
+            saved = None  # 检查点对应的(偏移, 行数, 状态)
+            # 从头读取时顺便计算内容哈希
+            hasher = hashlib.sha1() if offset == 0 else None
+            for first_line_num, lines, end_offset in iter_byte_blocks(f, lines_done + 1,
+                                                                      chunk_bytes, hasher):
+                if end_offset is None:
+                    # 最后一行没有换行，可能仍在写入，检查点保存在该行之前
+                    saved = (offset, lines_done, max_abs_state(max_abs, errors))
+                else:
+                    offset, lines_done = end_offset, first_line_num + len(lines) - 1
+                start = time.perf_counter()
+                values = parse_last_column(lines, first_line_num, errors)
+                parsed = time.perf_counter()
+                if values.size:
+                    block_max = np.abs(values).max()
+                    if max_abs is None or block_max > max_abs:
+                        max_abs = block_max
+                info['parse_seconds'] += parsed - start
+                info['reduce_seconds'] += time.perf_counter() - parsed
+                info['lines'] += len(lines)
+                if errors.aborted is not None:
+                    # 连续错误行过多，文件已损坏，不再读取剩余部分
+                    max_abs = None
+                    break
+            info['bytes'] = f.tell() - info.get('resumed_bytes', 0)
+            if errors.aborted is None:
+                if saved is None:
+                    saved = (offset, lines_done, max_abs_state(max_abs, errors))
+                info['checkpoint'] = Checkpoint(saved[0], saved[1], prefix_hash(f, saved[0]),
+                                                saved[2])
+                if hasher is not None:
+                    info['sha1'] = hasher.hexdigest()
+            return max_abs, errors
     except Exception as e:
         print(f"处理文件 {file_path} 时出错: {str(e)}")
-        return None, []
-
-def extract_numbers(filename):
-    """从文件名中提取序号a和序号b"""
-    # 分割文件名获取序号a
-    parts = filename.split('_')
-    if len(parts) >= 2:
-        num_a = parts[1]  # 获取B后的数字
-    else:
-        return None, None
-    
-    # 提取barfiber后的数字（序号b）
-    match = re.search(r'barfiber([-.0-9]+)\.out$', filename)
-    if match:
-        num_b = float(match.group(1))
-        return num_a, num_b
-    return None, None
-
-def write_error_log(output_dir, folder_name, errors):
-    """写入错误日志"""
-    if errors:
-        log_filename = f"error_log_{folder_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        log_path = os.path.join(output_dir, log_filename)
-        with open(log_path, 'w', encoding='utf-8') as f:
-            f.write(f"错误日志 - {folder_name}\n")
-            f.write("=" * 50 + "\n\n")
-            for file_path, file_errors in errors.items():
-                if file_errors:
-                    f.write(f"\n文件: {os.path.basename(file_path)}\n")
-                    for line_num, line_content in file_errors:
-                        f.write(f"行 {line_num}: {line_content}\n")
-        return log_path
-    return None
+        info['exception'] = str(e)
+        return None, errors
 
-def process_folders():
-    """主处理函数"""
-    root = tk.Tk()
-    root.withdraw()  # 隐藏主窗口
+def reduce_file(task, checkpoint=None):
+    """进程池工作函数：将单个文件归约为(num_a, num_b, {统计量: 最后一列的值}, errors, info)
+
+    task为(file_path, num_a, num_b, stats, limits)；checkpoint为缓存中上次读取的检查点；
+    info为该文件的读取量和耗时统计及新的检查点，见process_file。
+    """
+    from reduction_engine import reduce_file_stats
+    file_path, num_a, num_b, stats, limits = task
+    info = {}
+    if stats == DEFAULT_STATS:
+        # 只需最大绝对值时使用只解析最后一列的快速路径
+        max_abs_value, file_errors = process_file(file_path, info=info, limits=limits,
+                                                  checkpoint=checkpoint)
+        return num_a, num_b, {'maxabs': max_abs_value}, file_errors, info
     
-    # 用列表存储选择的文件夹
-    folder_paths = []
+    try:
+        values, file_errors = reduce_file_stats(file_path, stats, info=info, limits=limits,
+                                                checkpoint=checkpoint)
+    except Exception as e:
+        print(f"处理文件 {file_path} 时出错: {str(e)}")
+        info['exception'] = str(e)
+        return num_a, num_b, {spec: None for spec in stats}, LineErrors(limits), info
+    values = {spec: None if value is None else value[-1] for spec, value in values.items()}
+    return num_a, num_b, values, file_errors, info
+
+def check_unique_records(entries):
+    """结果表格只按(记录, 位置)区分，多个文件对应同一单元格（如同一文件夹中有不同试件或轴压）时抛出ValueError"""
+    seen = {}
+    for entry in entries:
+        key = (entry.record, entry.position)
+        if key in seen:
+            raise ValueError(
+                f"{os.path.basename(seen[key])} 与 {os.path.basename(entry.path)} "
+                f"对应结果表格的同一单元格（B{entry.record}），请用--specimen和--load只选择一组试件和轴压")
+        seen[key] = entry.path
+
+def channel_width(entries):
+    """通道文件的列数，取自第一个非空文件，全部为空时返回None"""
+    for entry in entries:
+        width = record_width(entry.path)
+        if width is not None:
+            return width
+    return None
+
+def parse_channels(channel, index):
+    """通道参数：逗号分隔的通道名，all（或None）为索引中的全部通道，返回通道列表"""
+    if channel is None or channel.strip().lower() == 'all':
+        return index.channels()
+    return [name.strip() for name in channel.split(",") if name.strip()]
+
+def list_channel_tasks(index, selection=None, stats=DEFAULT_STATS, limits=DEFAULT_LIMITS):
+    """按通道分组列出要处理的文件，返回{通道: [(file_path, num_a, num_b, stats, limits)]}，按文件名排序
+
+    selection['channel']可为逗号分隔的多个通道或all。有位置（序号b）的通道（如barfiber）
+    只取带位置的文件；没有位置的通道（如disp、acc101）每个记录一个文件，num_b为None。
+    多个文件对应结果表格的同一单元格时抛出ValueError，见check_unique_records；
+    需要时间列的统计量（peak_time、window_max）与只有一列的通道（如acc101）同时选择时也抛出ValueError。
+    """
+    from reduction_engine import make_statistic
+    selection = dict(DEFAULT_SELECTION if selection is None else selection)
+    timed = [spec for spec in stats if make_statistic(spec).timed]
+    groups = {}
+    for channel in parse_channels(selection.pop('channel', None), index):
+        entries = index.query(channel=channel, **selection)
+        if any(entry.position is not None for entry in entries):
+            entries = [entry for entry in entries if entry.position is not None]
+        check_unique_records(entries)
+        if timed and channel_width(entries) == 1:
+            raise ValueError(f"通道 {channel} 的文件只有一列（没有时间列），不能计算{'、'.join(timed)}，"
+                             f"请只选择有时间列的通道")
+        groups[channel] = [(entry.path, f"B{entry.record}", entry.position, stats, limits)
+                           for entry in entries]
+    return groups
+
+def channel_scale(channel, scale):
+    """通道的放大系数：只有barfiber（应变）乘以scale，其他通道（位移、加速度）保持原单位
+
+    与同一次运行中选择了哪些其他通道无关，同一通道的结果表格单位始终相同。
+    """
+    return scale if channel == DEFAULT_CHANNEL else 1
+
+def parse_shard(text):
+    """分片参数"K/N"（第K个分片，共N个，1 ≤ K ≤ N），返回(K, N)，格式错误时抛出ValueError"""
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"分片格式应为K/N，如2/8：{text}") from None
+    if not 1 <= index <= count:
+        raise ValueError(f"分片序号必须在1到{count}之间：{text}")
+    return index, count
+
+def shard_of(file_path, count):
+    """文件所属的分片（1到count），由文件名的CRC32决定，与运行的节点和挂载路径无关"""
+    return zlib.crc32(os.path.basename(file_path).encode('utf-8')) % count + 1
+
+def reduce_channels(folder_path, executor=None, template=DEFAULT_TEMPLATE, selection=None,
+                    cache=None, stats=DEFAULT_STATS, monitor=None, folder_record=None,
+                    limits=DEFAULT_LIMITS, shard=None):
+    """一次扫描文件夹、一次归约全部所选通道的文件，每个文件只读取一次，executor为None时在当前进程中串行处理
+
+    selection为传给FolderIndex.query的筛选条件，默认处理barfiber通道，见list_channel_tasks；
+    提供cache（ReductionCache）时只解析新增或修改过的文件；
+    提供monitor（RunMonitor）时记录各阶段耗时并报告进度；
+    limits（ErrorLimits）为每个文件保存错误行的上限和放弃文件的连续错误行数；
+    shard为(序号, 分片数)时只归约属于该分片的文件，见shard_of。
+    返回{通道: (任务列表, 与任务一一对应的reduce_file结果)}，包括没有文件的通道。
+    """
+    if monitor is None:
+        monitor = RunMonitor()
+    if folder_record is None:
+        folder_record = monitor.start_folder(folder_path)
+    with monitor.stage(folder_record, 'listing'):
+        groups = list_channel_tasks(FolderIndex(folder_path, template), selection, stats,
+                                    limits)
+    if shard is not None:
+        groups = {channel: [task for task in channel_tasks if shard_of(task[0], shard[1]) == shard[0]]
+                  for channel, channel_tasks in groups.items()}
+    tasks = [task for channel_tasks in groups.values() for task in channel_tasks]
+    monitor.plan_files(folder_record, [task[0] for task in tasks])
     
-    # 循环选择文件夹
-    while True:
-        folder_path = filedialog.askdirectory(
-            title=f"请选择包含barfiber文件的文件夹 ({len(folder_paths) + 1})"
-        )
-        
-        if not folder_path:
-            break
-            
-        folder_paths.append(folder_path)
+    # 全部通道的文件在同一个进程池中归约，再按通道拆分
+    reduced = reduce_tasks(tasks, executor, cache, stats, limits, monitor, folder_record)
+    if cache is not None:
+        cache.prune([task[0] for task in tasks])
+    channel_reduced = {}
+    start = 0
+    for channel, channel_tasks in groups.items():
+        end = start + len(channel_tasks)
+        channel_reduced[channel] = (channel_tasks, reduced[start:end])
+        start = end
+    return channel_reduced
+
+def assemble_channels(channel_reduced, stats=DEFAULT_STATS, scale=DEFAULT_SCALE):
+    """将reduce_channels的结果整理为{通道: (results, all_num_a, all_num_b, all_errors)}
+
+    没有文件的通道不出现在结果中。
+    """
+    return {channel: assemble_results(tasks, reduced, stats,
+                                      channel_scale(channel, scale))
+            for channel, (tasks, reduced) in channel_reduced.items() if tasks}
+
+def reduce_tasks(tasks, executor=None, cache=None, stats=DEFAULT_STATS, limits=DEFAULT_LIMITS,
+                 monitor=None, folder_record=None):
+    """归约任务列表中的文件，返回与tasks一一对应的reduce_file结果
+
+    提供cache时先查找缓存，只解析新增或修改过的文件，并保存新的归约结果。
+    """
+    if cache is not None:
+        from barfiber_cache import file_fingerprint
+    if monitor is None:
+        monitor = RunMonitor()
+    if folder_record is None:
+        folder_record = monitor.start_folder("")
+    reduced = [None] * len(tasks)
+    pending = []  # 需要重新解析的任务序号
+    fingerprints = {}
+    with monitor.stage(folder_record, 'cache'):
+        for i, (file_path, num_a, num_b, _, _) in enumerate(tasks):
+            if cache is not None:
+                fingerprints[i] = file_fingerprint(file_path)
+                hit = cache.lookup(file_path, fingerprints[i], stats, limits)
+                if hit is not None:
+                    reduced[i] = (num_a, num_b) + hit + ({'cached': True},)
+                    monitor.file_done(folder_record, file_path, reduced[i][4], hit[1].total)
+                    continue
+            pending.append(i)
         
-        if not messagebox.askyesno("继续", "是否继续选择其他文件夹？"):
-            break
+        # 只是追加了内容的文件从上次的检查点继续读取
+        checkpoints = [cache.checkpoint(tasks[i][0], stats, limits) if cache is not None
+                       else None for i in pending]
     
-    if not folder_paths:
-        messagebox.showwarning("警告", "未选择任何文件夹")
-        root.destroy()
-        return
+    pending_tasks = [tasks[i] for i in pending]
+    if executor is None:
+        fresh = map(reduce_file, pending_tasks, checkpoints)
+    else:
+        # map按提交顺序返回结果，与串行路径的输出完全一致
+        fresh = executor.map(reduce_file, pending_tasks, checkpoints)
+    for i, result in zip(pending, fresh):
+        reduced[i] = result
+        checkpoint = result[4].pop('checkpoint', None)
+        sha1 = result[4].pop('sha1', None)
+        monitor.file_done(folder_record, tasks[i][0], result[4], result[3].total)
+        if cache is not None:
+            with monitor.stage(folder_record, 'cache'):
+                cache.store(tasks[i][0], fingerprints[i], stats, limits, result[2], result[3],
+                            checkpoint, sha1)
+    return reduced
+
+def assemble_results(tasks, reduced, stats=DEFAULT_STATS, scale=DEFAULT_SCALE):
+    """将归约结果整理为(results, all_num_a, all_num_b, all_errors)
+
+    results的格式为{统计量: {num_b: {num_a: value}}}，all_errors为{文件路径: LineErrors}。
+    """
+    from reduction_engine import make_statistic
+    results = {spec: {} for spec in stats}  # 格式: {统计量: {num_b: {num_a: value}}}
+    all_num_a = set()  # 存储所有的序号a
+    all_num_b = set()  # 存储所有的序号b
+    all_errors = {}  # 存储所有错误信息
+    for task, (num_a, num_b, values, file_errors, _) in zip(tasks, reduced):
+        # 记录错误信息
+        if file_errors:
+            all_errors[task[0]] = file_errors
+        if file_errors.aborted is not None:
+            # 被放弃的文件保留其行列，单元格输出为error
+            all_num_a.add(num_a)
+            all_num_b.add(num_b)
         
-    # 选择输出目录
-    output_dir = filedialog.askdirectory(
-        title="请选择输出文件夹"
-    )
+        for spec, value in values.items():
+            if value is not None:
+                # 默认乘以1000，时间类统计量不缩放
+                if make_statistic(spec).scaled:
+                    value = value * scale
+                results[spec].setdefault(num_b, {})[num_a] = value
+                all_num_a.add(num_a)
+                all_num_b.add(num_b)
+    return results, all_num_a, all_num_b, all_errors
+
+def results_filename(folder_name, spec, channel=DEFAULT_CHANNEL):
+    """统计量对应的结果文件名，最大绝对值沿用[文件夹名]_results.txt
+
+    barfiber以外的通道在文件夹名后加通道名，如[文件夹名]_disp_results.txt；
+    spec为None时为没有位置的通道的汇总表格（每个统计量一行）。
+    """
+    prefix = folder_name if channel == DEFAULT_CHANNEL else f"{folder_name}_{channel}"
+    if spec is None or spec == 'maxabs':
+        return f"{prefix}_results.txt"
+    return f"{prefix}_{spec.replace(':', '_')}_results.txt"
+
+def add_results_table(writer, name, results, all_num_a, all_num_b):
+    """把b\\a二维结果表格加入writer，name为不含扩展名的文件名"""
+    import numpy as np
+    # 排序序号a（按B后面的数值排序）
+    sorted_num_a = sorted(all_num_a, key=lambda x: int(x[1:]))  # 去掉'B'后按数字排序
+    sorted_num_b = sorted(all_num_b)  # 序号b按数值排序
     
-    if not output_dir:
-        root.destroy()
-        return
-        
-    # 处理每个选择的文件夹
-    for folder_path in folder_paths:
-        folder_name = os.path.basename(folder_path)
-        
-        # 存储处理结果
-        results = {}  # 格式: {num_b: {num_a: value}}
-        all_num_a = set()  # 存储所有的序号a
-        all_num_b = set()  # 存储所有的序号b
-        all_errors = {}  # 存储所有错误信息
-        
-        # 遍历文件夹中的文件
-        pattern = re.compile(r'S2_B.*_IDA_8\.5MPa_barfiber.*\.out$')
-        for filename in os.listdir(folder_path):
-            if pattern.match(filename):
-                num_a, num_b = extract_numbers(filename)
-                if num_a is not None and num_b is not None:
-                    file_path = os.path.join(folder_path, filename)
-                    max_abs_value, file_errors = process_file(file_path)
-                    
-                    # 记录错误信息
-                    if file_errors:
-                        all_errors[file_path] = file_errors
-                    
-                    if max_abs_value is not None:
-                        if num_b not in results:
-                            results[num_b] = {}
-                        results[num_b][num_a] = max_abs_value * 1000  # 乘以1000
-                        all_num_a.add(num_a)
-                        all_num_b.add(num_b)
-        
-        if not results:
-            messagebox.showwarning("警告", f"文件夹 {folder_name} 中未找到符合格式的文件或处理失败")
+    text = [[str(results.get(num_b, {}).get(num_a, "error")) for num_a in sorted_num_a]
+            for num_b in sorted_num_b]
+    values = [[results.get(num_b, {}).get(num_a, np.nan) for num_a in sorted_num_a]
+              for num_b in sorted_num_b]
+    writer.add(name, sorted_num_b, sorted_num_a, values, text)
+
+def add_stats_table(writer, name, stats, results, all_num_a):
+    """把没有位置的通道（如disp、acc101）的结果加入writer：每个统计量一行，每个记录一列"""
+    import numpy as np
+    sorted_num_a = sorted(all_num_a, key=lambda x: int(x[1:]))
+    text = [[str(results[spec].get(None, {}).get(num_a, "error")) for num_a in sorted_num_a]
+            for spec in stats]
+    values = [[results[spec].get(None, {}).get(num_a, np.nan) for num_a in sorted_num_a]
+              for spec in stats]
+    writer.add(name, stats, sorted_num_a, values, text, corner="stat\\a")
+
+def channel_errors(channel_results):
+    """合并各通道的错误行，返回{文件路径: LineErrors}"""
+    all_errors = {}
+    for _, _, _, errors in channel_results.values():
+        all_errors.update(errors)
+    return all_errors
+
+def write_channel_outputs(output_dir, folder_name, stats, channel_results,
+                          output=DEFAULT_OUTPUT):
+    """写出assemble_channels的结果，返回(结果文件路径列表, 错误日志路径)
+
+    有位置的通道每个统计量一个b\\a表格，没有位置的通道一个统计量×记录的表格；
+    全部通道的错误行写入同一个错误日志。
+    """
+    writer = ResultsWriter.from_options(output_dir, f"{folder_name}_results", output)
+    for channel, (results, all_num_a, all_num_b, errors) in channel_results.items():
+        if not all_num_a:
+            continue
+        if all_num_b == {None}:
+            name = os.path.splitext(results_filename(folder_name, None, channel))[0]
+            add_stats_table(writer, name, stats, results, all_num_a)
             continue
+        for spec in stats:
+            name = os.path.splitext(results_filename(folder_name, spec, channel))[0]
+            add_results_table(writer, name, results[spec], all_num_a, all_num_b)
+    output_paths = writer.write()
+    
+    # 写入错误日志
+    log_path = write_error_log(output_dir, folder_name, channel_errors(channel_results))
+    return output_paths, log_path
+
+def open_cache(folder_path, rebuild=False, shard=None):
+    """打开文件夹的归约缓存，无法打开（如文件夹只读）时返回None
+
+    shard不为None时使用该分片单独的缓存文件，多个节点可同时处理共享的文件夹。
+    """
+    import sqlite3
+    from barfiber_cache import CACHE_FILENAME, ReductionCache, shard_cache_filename
+    filename = CACHE_FILENAME if shard is None else shard_cache_filename(shard)
+    try:
+        return ReductionCache(folder_path, rebuild, filename)
+    except (sqlite3.Error, OSError) as e:
+        print(f"无法使用缓存 {folder_path}: {str(e)}", file=sys.stderr)
+        return None
+
+def partial_filename(folder_name, shard):
+    """分片部分结果的文件名，如[文件夹名]_results.part-2-of-8.json"""
+    return f"{folder_name}_results.part-{shard[0]}-of-{shard[1]}.json"
+
+def write_partial(output_path, folder_name, shard, stats, scale, limits, channel_reduced):
+    """将一个分片的归约结果写为JSON部分结果文件，供merge_partials合并
+
+    只保存每个文件归约后的值和错误行，数值为JSON浮点数，合并后与单机运行的结果完全一致。
+    """
+    files = []
+    for channel, (tasks, reduced) in channel_reduced.items():
+        for task, (num_a, num_b, values, file_errors, _) in zip(tasks, reduced):
+            files.append({
+                'channel': channel, 'path': task[0], 'num_a': num_a, 'num_b': num_b,
+                'values': {spec: None if v is None else float(v) for spec, v in values.items()},
+                'errors': {'lines': list(file_errors), 'total': file_errors.total,
+                           'aborted': file_errors.aborted},
+            })
+    partial = {
+        'version': PARTIAL_VERSION, 'folder': folder_name, 'shard': list(shard),
+        'stats': list(stats), 'scale': scale, 'limits': list(limits),
+        'channels': list(channel_reduced), 'files': files,
+    }
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(partial, f, ensure_ascii=False)
+    return output_path
+
+def load_partials(partial_paths, skipped=None):
+    """读取并检查一组部分结果文件，返回{文件夹名: [按分片序号排列的部分结果]}
+
+    同一文件夹的部分结果必须覆盖全部分片且统计量、放大系数、错误上限一致，否则抛出ValueError。
+    不是部分结果的JSON文件（如同一输出目录中的分片运行报告）被跳过，skipped为列表时追加其路径。
+    """
+    folders = {}
+    for path in partial_paths:
+        with open(path, encoding='utf-8') as f:
+            partial = json.load(f)
+        if not isinstance(partial, dict) or not {'shard', 'files'} <= partial.keys():
+            if skipped is not None:
+                skipped.append(path)
+            continue
+        if partial.get('version') != PARTIAL_VERSION:
+            raise ValueError(f"不支持的部分结果文件版本：{path}")
+        folders.setdefault(partial['folder'], {})
+        shard = tuple(partial['shard'])
+        if shard in folders[partial['folder']]:
+            raise ValueError(f"文件夹 {partial['folder']} 的分片 {shard[0]}/{shard[1]} 重复：{path}")
+        folders[partial['folder']][shard] = partial
+    
+    merged = {}
+    for folder_name, shards in folders.items():
+        first = next(iter(shards.values()))
+        count = first['shard'][1]
+        missing = [k for k in range(1, count + 1) if (k, count) not in shards]
+        if missing or len(shards) != count:
+            raise ValueError(f"文件夹 {folder_name} 缺少分片："
+                             f"{', '.join(f'{k}/{count}' for k in missing) or '分片数不一致'}")
+        for partial in shards.values():
+            for key in ('stats', 'scale', 'limits', 'channels'):
+                if partial[key] != first[key]:
+                    raise ValueError(f"文件夹 {folder_name} 各分片的参数不一致：{key}")
+        merged[folder_name] = [shards[k, count] for k in range(1, count + 1)]
+    return merged
+
+def merge_partials(partials):
+    """将同一文件夹的部分结果合并为reduce_channels的格式，返回(stats, scale, channel_reduced)
+
+    每个通道的文件按文件名排序，与单机运行时的处理顺序相同。
+    """
+    first = partials[0]
+    stats = tuple(first['stats'])
+    limits = ErrorLimits(*first['limits'])
+    entries = {channel: [] for channel in first['channels']}
+    for partial in partials:
+        for entry in partial['files']:
+            entries[entry['channel']].append(entry)
+    channel_reduced = {}
+    for channel, channel_entries in entries.items():
+        channel_entries.sort(key=lambda entry: os.path.basename(entry['path']))
+        tasks, reduced = [], []
+        for entry in channel_entries:
+            errors = entry['errors']
+            tasks.append((entry['path'], entry['num_a'], entry['num_b'], stats, limits))
+            reduced.append((entry['num_a'], entry['num_b'], entry['values'],
+                            LineErrors(limits, errors['lines'], errors['total'],
+                                       errors['aborted']), {}))
+        channel_reduced[channel] = (tasks, reduced)
+    return stats, first['scale'], channel_reduced
+
+def merge_folder_partials(partial_paths, output_dir, output=DEFAULT_OUTPUT, skipped=None):
+    """合并各分片的部分结果并写出结果表格和错误日志，返回{文件夹名: (结果文件路径列表, 错误日志路径)}
+
+    文件夹中没有有效结果时对应的值为(None, 错误日志路径)；skipped见load_partials。
+    """
+    written = {}
+    for folder_name, partials in load_partials(partial_paths, skipped).items():
+        stats, scale, channel_reduced = merge_partials(partials)
+        channel_results = assemble_channels(channel_reduced, stats, scale)
+        if not any(all_num_a for _, all_num_a, _, _ in channel_results.values()):
+            written[folder_name] = (None, write_error_log(output_dir, folder_name,
+                                                          channel_errors(channel_results)))
+            continue
+        written[folder_name] = write_channel_outputs(output_dir, folder_name, stats,
+                                                     channel_results, output)
+    return written
+
+def process_folder(folder_path, output_dir, executor=None, template=DEFAULT_TEMPLATE,
+                   selection=None, scale=DEFAULT_SCALE, use_cache=True,
+                   rebuild_cache=False, stats=DEFAULT_STATS, monitor=None,
+                   limits=DEFAULT_LIMITS, output=DEFAULT_OUTPUT, shard=None):
+    """处理单个文件夹并写出结果，返回(结果文件路径列表, 错误日志路径)
+
+    每个统计量写出一个结果文件（output为输出格式和精度，见results_writer），
+    同时写出[文件夹名]_run_report.json运行报告；
+    selection['channel']为逗号分隔的多个通道或all时，一次读取全部所选通道的文件，
+    每个通道写出各自的结果表格，见write_channel_outputs；
+    文件夹中没有有效结果时返回(None, 错误日志路径)，没有错误行时错误日志路径为None。
+    shard为(K, N)时只处理第K个分片的文件，写出部分结果文件（即使为空）和该分片的运行报告，
+    返回([部分结果文件路径], None)，全部分片完成后用merge_folder_partials合并。
+    """
+    folder_name = os.path.basename(os.path.normpath(folder_path))
+    if monitor is None:
+        monitor = RunMonitor()
+    folder_record = monitor.start_folder(folder_path)
+    cache = open_cache(folder_path, rebuild_cache, shard) if use_cache else None
+    try:
+        channel_reduced = reduce_channels(
+            folder_path, executor, template, selection, cache, stats, monitor,
+            folder_record, limits, shard)
+    finally:
+        if cache is not None:
+            cache.close()
+    if shard is not None:
+        with monitor.stage(folder_record, 'writing'):
+            partial_path = write_partial(
+                os.path.join(output_dir, partial_filename(folder_name, shard)), folder_name,
+                shard, stats, scale, limits, channel_reduced)
+        monitor.write_report(folder_record, os.path.join(
+            output_dir, f"{folder_name}_run_report.shard-{shard[0]}-of-{shard[1]}.json"))
+        return [partial_path], None
+    channel_results = assemble_channels(channel_reduced, stats, scale)
+    if not any(all_num_a for _, all_num_a, _, _ in channel_results.values()):
+        # 没有有效结果时仍写出错误日志
+        return None, write_error_log(output_dir, folder_name, channel_errors(channel_results))
+    
+    # 生成输出文件
+    with monitor.stage(folder_record, 'writing'):
+        output_paths, log_path = write_channel_outputs(
+            output_dir, folder_name, stats, channel_results, output)
+    monitor.write_report(folder_record,
+                         os.path.join(output_dir, f"{folder_name}_run_report.json"))
+    return output_paths, log_path
+
+def run_batch(folder_paths, output_dir, template=DEFAULT_TEMPLATE, selection=None,
+              scale=DEFAULT_SCALE, workers=None, report=None, use_cache=True,
+              rebuild_cache=False, stats=DEFAULT_STATS, progress=None,
+              limits=DEFAULT_LIMITS, cancel=None, output=DEFAULT_OUTPUT, shard=None):
+    """依次处理多个文件夹，返回处理失败的文件夹数
+
+    report(level, message)用于反馈警告和错误，level为"warning"或"error"，
+    默认输出到标准错误；progress(snapshot)在每个文件完成时调用，见RunMonitor；
+    cancel（threading.Event）被设置后在下一个文件完成时抛出RunCancelled，
+    已归约的文件保留在缓存中。shard为(K, N)时只处理第K个分片，见process_folder。
+    """
+    if report is None:
+        report = lambda level, message: print(message, file=sys.stderr)
+    from concurrent.futures import ProcessPoolExecutor
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    monitor = RunMonitor(progress, len(folder_paths), cancel)
+    
+    failures = 0
+    try:
+        for folder_path in folder_paths:
+            folder_name = os.path.basename(os.path.normpath(folder_path))
+            try:
+                output_paths, log_path = process_folder(
+                    folder_path, output_dir, executor, template, selection, scale,
+                    use_cache, rebuild_cache, stats, monitor, limits, output, shard)
+            except RunCancelled:
+                raise
+            except Exception as e:
+                report("error", f"处理文件夹 {folder_name} 时出错：{str(e)}")
+                failures += 1
+                continue
+            
+            if output_paths is None:
+                report("warning", f"文件夹 {folder_name} 中未找到符合格式的文件或处理失败")
+                if log_path:
+                    print(f"错误日志已保存到：{log_path}")
+                failures += 1
+                continue
+            
+            for output_path in output_paths:
+                print(f"结果已保存到：{output_path}")
+            if log_path:
+                print(f"错误日志已保存到：{log_path}")
+    finally:
+        if executor is not None:
+            # 取消时丢弃尚未开始的文件
+            executor.shutdown(cancel_futures=True)
+    return failures
+
+class FolderWatcher:
+    """监视单个文件夹，记录文件在settle秒内不再变化（写入完成）后才归约
+
+    已归约的结果保存在内存中，每次检查只归约新完成或被修改的文件，再重写结果表格；
+    selection['channel']可为多个通道或all，与process_folder相同，每个通道写出各自的结果表格。
+    """
+
+    def __init__(self, folder_path, output_dir, template=DEFAULT_TEMPLATE, selection=None,
+                 scale=DEFAULT_SCALE, stats=DEFAULT_STATS, limits=DEFAULT_LIMITS,
+                 settle=WATCH_SETTLE, cache=None, output=DEFAULT_OUTPUT):
+        self.folder_path = folder_path
+        self.folder_name = os.path.basename(os.path.normpath(folder_path))
+        self.output_dir = output_dir
+        self.template = template
+        self.selection = selection
+        self.scale = scale
+        self.stats = stats
+        self.limits = limits
+        self.settle = settle
+        self.cache = cache
+        self.output = output
+        self.channels = []  # 上次检查时所选的全部通道
+        self.reduced = {}  # {文件路径: (指纹, 通道, 任务, reduce_file结果)}
+        self.changing = {}  # {文件路径: (指纹, 首次出现该指纹的时间)}
+        self.dirty = False  # 有结果尚未写出
+        self.log_path = None
+
+    def poll(self, executor=None):
+        """检查一次文件夹，结果表格被重写时返回结果文件路径列表，否则返回None"""
+        from barfiber_cache import file_fingerprint
+        now = time.monotonic()
+        groups = list_channel_tasks(FolderIndex(self.folder_path, self.template),
+                                    self.selection, self.stats, self.limits)
+        if list(groups) != self.channels:
+            self.channels = list(groups)
+            self.dirty = True
+        channel_of = {task[0]: channel for channel, tasks in groups.items() for task in tasks}
+        tasks = [task for channel_tasks in groups.values() for task in channel_tasks]
+        current = set(channel_of)
+        ready = []
+        fingerprints = {}
+        for task in tasks:
+            file_path = task[0]
+            try:
+                fingerprint = file_fingerprint(file_path)
+            except OSError:  # 扫描后被删除
+                continue
+            known = self.reduced.get(file_path)
+            if known is not None and known[0] == fingerprint:
+                continue
+            seen = self.changing.get(file_path)
+            if seen is None or seen[0] != fingerprint:
+                # 新文件或仍在写入，重新开始计时
+                self.changing[file_path] = (fingerprint, now)
+            elif now - seen[1] >= self.settle:
+                ready.append(task)
+                fingerprints[file_path] = fingerprint
         
-        # 排序序号a（按B后面的数值排序）
-        sorted_num_a = sorted(all_num_a, key=lambda x: int(x[1:]))  # 去掉'B'后按数字排序
-        sorted_num_b = sorted(all_num_b)  # 序号b按数值排序
+        # 被删除的文件不再出现在结果中
+        for file_path in [p for p in self.reduced if p not in current]:
+            del self.reduced[file_path]
+            self.dirty = True
+        for file_path in [p for p in self.changing if p not in current]:
+            del self.changing[file_path]
         
-        # 生成输出文件
-        output_filename = f"{folder_name}_results.txt"
-        output_path = os.path.join(output_dir, output_filename)
+        if ready:
+            for task, result in zip(ready, reduce_tasks(ready, executor, self.cache,
+                                                        self.stats, self.limits)):
+                self.reduced[task[0]] = (fingerprints[task[0]], channel_of[task[0]], task,
+                                         result)
+                del self.changing[task[0]]
+            if self.cache is not None:
+                self.cache.commit()
+            self.dirty = True
+        if not self.dirty:
+            return None
+        return self.write()
+
+    def write(self):
+        """按当前已归约的文件重写结果表格和错误日志"""
+        channel_reduced = {channel: ([], []) for channel in self.channels}
+        for _, channel, task, result in sorted(self.reduced.values(),
+                                               key=lambda entry: entry[2][0]):
+            channel_reduced[channel][0].append(task)
+            channel_reduced[channel][1].append(result)
+        channel_results = assemble_channels(channel_reduced, self.stats, self.scale)
+        if not any(all_num_a for _, all_num_a, _, _ in channel_results.values()):
+            self.dirty = False
+            return None
+        output_paths, log_path = write_channel_outputs(
+            self.output_dir, self.folder_name, self.stats, channel_results, self.output)
+        # 只保留最新的错误日志
+        if self.log_path and self.log_path != log_path and os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self.log_path = log_path
+        self.dirty = False
+        return output_paths
+
+def watch_folders(folder_paths, output_dir, template=DEFAULT_TEMPLATE, selection=None,
+                  scale=DEFAULT_SCALE, workers=None, report=None, use_cache=True,
+                  rebuild_cache=False, stats=DEFAULT_STATS, limits=DEFAULT_LIMITS,
+                  interval=WATCH_INTERVAL, settle=WATCH_SETTLE, output=DEFAULT_OUTPUT):
+    """监视模式：每interval秒轮询一次文件夹，新完成的文件归约后立即更新结果表格，按Ctrl+C结束
+
+    写出失败（如结果文件被其他程序占用）时通过report报告，下次检查时重试。
+    """
+    if report is None:
+        report = lambda level, message: print(message, file=sys.stderr)
+    from concurrent.futures import ProcessPoolExecutor
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    watchers = [FolderWatcher(folder_path, output_dir, template, selection, scale, stats,
+                              limits, settle,
+                              open_cache(folder_path, rebuild_cache) if use_cache else None,
+                              output)
+                for folder_path in folder_paths]
+    print(f"正在监视 {len(watchers)} 个文件夹，每 {interval:g} 秒检查一次，按Ctrl+C结束")
+    try:
+        while True:
+            for watcher in watchers:
+                try:
+                    output_paths = watcher.poll(executor)
+                except Exception as e:
+                    report("error", f"处理文件夹 {watcher.folder_name} 时出错：{str(e)}")
+                    continue
+                if output_paths:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {watcher.folder_name}："
+                          f"已归约 {len(watcher.reduced)} 个文件，"
+                          f"结果已更新：{', '.join(output_paths)}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("已停止监视")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        for watcher in watchers:
+            if watcher.cache is not None:
+                watcher.cache.close()
+
+def process_folders(workers=None):
+    """图形界面入口：每次选择一组文件夹和输出目录作为一个任务，在后台线程中调用run_batch
+
+    多个任务可排队并同时运行，运行中的任务可随时取消。
+    """
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, ttk
+    from gui_jobs import JobPanel, JobRunner
+    
+    root = tk.Tk()
+    root.title("barfiber处理")
+    
+    def handle(job, kind, payload):
+        panel.update_job(job, kind, payload)
+        if kind == "report":
+            level, message = payload
+            if level == "error":
+                messagebox.showerror("错误", message)
+            else:
+                messagebox.showwarning("警告", message)
+        elif kind == "done":
+            messagebox.showinfo("完成", f"{job.name} 处理完成！\n结果文件保存在：{payload}")
+        elif kind == "error":
+            messagebox.showerror("错误", f"{job.name} 处理出错：{str(payload)}")
+    
+    runner = JobRunner(root, handle)
+    panel = JobPanel(root, runner)
+    panel.pack(fill="both", expand=True, padx=10, pady=5)
+    
+    def run_job(job, folder_paths, output_dir):
+        # 在后台线程中运行，界面更新全部通过job.post交回主循环
+        run_batch(folder_paths, output_dir, workers=workers,
+                  report=lambda level, message: job.post("report", (level, message)),
+                  progress=lambda snapshot: job.post("progress", snapshot),
+                  cancel=job.cancel_event)
+        return output_dir
+    
+    def add_job():
+        # 用列表存储选择的文件夹
+        folder_paths = []
         
-        try:
-            with open(output_path, 'w') as f:
-                # 写入表头
-                header = "\t".join(["b\\a"] + sorted_num_a)
-                f.write(header + "\n")
+        # 循环选择文件夹
+        while True:
+            folder_path = filedialog.askdirectory(
+                title=f"请选择包含barfiber文件的文件夹 ({len(folder_paths) + 1})"
+            )
+            
+            if not folder_path:
+                break
                 
-                # 写入数据行
-                for num_b in sorted_num_b:
-                    row = [f"{num_b}"]
-                    for num_a in sorted_num_a:
-                        value = results.get(num_b, {}).get(num_a, "error")
-                        row.append(str(value))
-                    f.write("\t".join(row) + "\n")
+            folder_paths.append(folder_path)
             
-            # 写入错误日志
-            if all_errors:
-                log_path = write_error_log(output_dir, folder_name, all_errors)
-                if log_path:
-                    print(f"错误日志已保存到：{log_path}")
+            if not messagebox.askyesno("继续", "是否继续选择其他文件夹？"):
+                break
+        
+        if not folder_paths:
+            messagebox.showwarning("警告", "未选择任何文件夹")
+            return
             
-        except Exception as e:
-            messagebox.showerror("错误", f"保存结果时出错：{str(e)}")
+        # 选择输出目录
+        output_dir = filedialog.askdirectory(
+            title="请选择输出文件夹"
+        )
+        
+        if not output_dir:
+            return
+        
+        name = ", ".join(os.path.basename(os.path.normpath(p)) for p in folder_paths)
+        runner.submit(name, run_job, folder_paths, output_dir)
+    
+    def on_closing():
+        if runner.active_jobs() and not messagebox.askokcancel(
+                "退出", "仍有任务在运行，确定要取消并退出吗？"):
+            return
+        runner.shutdown()
+        root.destroy()
+    
+    ttk.Button(root, text="添加任务", command=add_job).pack(pady=5)
+    root.protocol("WM_DELETE_WINDOW", on_closing)
+    root.after(0, add_job)  # 启动后直接选择第一个任务的文件夹
+    root.mainloop()
+
+def merge_main(patterns, output_dir, output=DEFAULT_OUTPUT):
+    """--merge模式：合并部分结果文件，返回退出码"""
+    partial_paths = []
+    for pattern in patterns:
+        # Windows命令行不会自动展开通配符
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        partial_paths += [path for path in matches if path not in partial_paths]
+    if not partial_paths:
+        print("没有找到部分结果文件", file=sys.stderr)
+        return 1
+    skipped = []
+    try:
+        written = merge_folder_partials(partial_paths, output_dir, output, skipped)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"合并部分结果时出错：{str(e)}", file=sys.stderr)
+        return 1
+    for path in skipped:
+        print(f"不是部分结果文件，已跳过：{os.path.basename(path)}", file=sys.stderr)
+    if not written:
+        print("没有找到部分结果文件", file=sys.stderr)
+        return 1
+    failures = 0
+    for folder_name, (output_paths, log_path) in written.items():
+        if output_paths is None:
+            print(f"文件夹 {folder_name} 中未找到符合格式的文件或处理失败", file=sys.stderr)
+            if log_path:
+                print(f"错误日志已保存到：{log_path}")
+            failures += 1
             continue
+        for output_path in output_paths:
+            print(f"结果已保存到：{output_path}")
+        if log_path:
+            print(f"错误日志已保存到：{log_path}")
+    return 1 if failures else 0
+
+def build_parser():
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        description="提取barfiber文件最后一列的最大绝对值并生成结果表格")
+    parser.add_argument("folders", nargs="+",
+                        help="包含barfiber文件的输入文件夹（--merge时为部分结果文件，可用通配符）")
+    parser.add_argument("-o", "--output-dir", required=True, help="输出文件夹")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE,
+                        help="文件名模板（默认：%(default)s）")
+    parser.add_argument("--channel", default=DEFAULT_SELECTION['channel'],
+                        help="要处理的通道，多个通道用逗号分隔（如disp,acc,barfiber），"
+                             "all为文件夹中的全部通道；每个文件只读取一次，每个通道输出各自的"
+                             "结果表格（默认：%(default)s）")
+    parser.add_argument("--specimen", help="只处理指定试件，如S2")
+    parser.add_argument("--load", help="只处理指定轴压，如8.5")
+    parser.add_argument("--scale", type=float, default=DEFAULT_SCALE,
+                        help="barfiber（应变）结果的放大系数，其他通道不缩放（默认：%(default)s）")
+    parser.add_argument("--stats", default=",".join(DEFAULT_STATS),
+                        help="逗号分隔的统计量，可选maxabs、peak_time、rms、residual、"
+                             "window_max:起始时间:结束时间，每个统计量输出一个结果表格"
+                             "（默认：%(default)s）")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="并行进程数，1表示串行（默认：CPU核数）")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="不读取也不写入归约缓存，重新解析全部文件")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="忽略已有缓存，重新解析全部文件并重建缓存")
+    parser.add_argument("--max-error-lines", type=int, default=DEFAULT_LIMITS.max_lines,
+                        help="每个文件在错误日志中最多列出的错误行数，0表示不限"
+                             "（默认：%(default)s）")
+    parser.add_argument("--abort-after", type=int, default=None,
+                        help="连续出现该数量的错误行时放弃该文件，结果记为error（默认：不放弃）")
+    parser.add_argument("--watch", action="store_true",
+                        help="监视模式：持续检查文件夹，文件写入完成后立即归约并更新结果表格")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL,
+                        help="监视模式检查文件夹的间隔秒数（默认：%(default)s）")
+    parser.add_argument("--settle", type=float, default=WATCH_SETTLE,
+                        help="文件大小保持不变多少秒后视为写入完成（默认：%(default)s）")
+    parser.add_argument("--formats", default=",".join(DEFAULT_OUTPUT.formats),
+                        help=f"逗号分隔的输出格式，可选{'、'.join(FORMATS)}；npz和parquet"
+                             "把全部结果表格合并为[文件夹名]_results.npz/.parquet，"
+                             "parquet需要安装pyarrow（默认：%(default)s）")
+    parser.add_argument("--precision", type=int, default=None,
+                        help="文本表格保留的小数位数（默认：原样输出）")
+    parser.add_argument("--shard", metavar="K/N",
+                        help="分片运行：只处理文件名哈希属于第K个分片（共N个）的文件，"
+                             "写出[文件夹名]_results.part-K-of-N.json部分结果，"
+                             "可在多个节点上同时运行，全部完成后用--merge合并")
+    parser.add_argument("--merge", action="store_true",
+                        help="合并各分片的部分结果文件，写出与单机运行相同的结果表格和错误日志")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="不在终端显示进度")
+    return parser
+
+def main(argv=None):
+    """命令行入口，返回退出码：0成功，1有文件夹处理失败，2参数错误"""
+    from reduction_engine import make_statistic
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        compile_template(args.template)
+    except re.error as e:
+        parser.error(f"无效的文件名模板 {args.template}: {e}")
+    stats = tuple(spec.strip() for spec in args.stats.split(",") if spec.strip())
+    try:
+        for spec in stats:
+            make_statistic(spec)
+    except ValueError as e:
+        parser.error(str(e))
+    if not stats:
+        parser.error("至少需要一个统计量")
+    if args.workers is not None and args.workers < 1:
+        parser.error("并行进程数必须为正整数")
+    if args.max_error_lines < 0:
+        parser.error("错误行上限不能为负数")
+    if args.abort_after is not None and args.abort_after < 1:
+        parser.error("连续错误行数必须为正整数")
+    if args.interval <= 0 or args.settle < 0:
+        parser.error("检查间隔必须为正数，稳定时间不能为负数")
+    formats = tuple(fmt.strip() for fmt in args.formats.split(",") if fmt.strip())
+    try:
+        check_formats(formats)
+    except ValueError as e:
+        parser.error(str(e))
+    if not formats:
+        parser.error("至少需要一种输出格式")
+    if args.precision is not None and args.precision < 0:
+        parser.error("小数位数不能为负数")
+    if not os.path.isdir(args.output_dir):
+        parser.error(f"输出文件夹不存在：{args.output_dir}")
+    shard = None
+    if args.shard is not None:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.watch or args.merge:
+            parser.error("--shard不能与--watch或--merge同时使用")
+    output = OutputOptions(formats, args.precision)
+    if args.merge:
+        if args.watch:
+            parser.error("--merge不能与--watch同时使用")
+        return merge_main(args.folders, args.output_dir, output)
     
-    messagebox.showinfo("完成", f"处理完成！\n结果文件保存在：{output_dir}")
-    root.destroy()
+    selection = {'channel': args.channel, 'specimen': args.specimen, 'load': args.load}
+    limits = ErrorLimits(args.max_error_lines or None, args.abort_after)
+    if args.watch:
+        watch_folders(args.folders, args.output_dir, args.template, selection, args.scale,
+                      args.workers, use_cache=not args.no_cache,
+                      rebuild_cache=args.rebuild_cache, stats=stats, limits=limits,
+                      interval=args.interval, settle=args.settle, output=output)
+        return 0
+    # 只在交互式终端中显示进度，避免在日志文件中写入大量刷新行
+    interactive = sys.stderr is not None and sys.stderr.isatty()
+    progress = terminal_progress() if interactive and not args.quiet else None
+    failures = run_batch(args.folders, args.output_dir, args.template, selection,
+                         args.scale, args.workers, use_cache=not args.no_cache,
+                         rebuild_cache=args.rebuild_cache, stats=stats, progress=progress,
+                         limits=limits, output=output, shard=shard)
+    return 1 if failures else 0
 
 if __name__ == "__main__":
-    process_folders()
+    import multiprocessing
+    multiprocessing.freeze_support()  # PyInstaller打包后子进程需要
+    if len(sys.argv) > 1:
+        # 命令行模式
+        sys.exit(main())
+    else:
+        # GUI模式
+        process_folders()
@@ -2,7 +2,9 @@ import os
 import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import numpy as np
+from gui_jobs import JobPanel, JobRunner
+# NumPy、results_cube和results_writer在首次生成文件时才导入（见各方法），
+# 启动时只加载界面所需的模块，窗口可以更快出现
 
 class ResultProcessor:
     def __init__(self):
@@ -12,11 +14,17 @@ class ResultProcessor:
         # 定义常量数组
         self.array_A = [100, 200, 300, 400, 500, 600, 700]
         self.array_B = [f"{i/10:.1f}g" for i in range(1, 18)]  # 0.1g到1.7g
-        self.array_C = [-31, -18.8] + [i for i in range(0, 71, 10)]  # -31, -18.8, 0, 10, ..., 70
+        # 纤维位置不再写死，取自results文件的行标题
         
         # 存储选择的文件
         self.selected_files = {}  # {a_value: file_path}
         
+        # 常驻内存的会话：已解析的results文件和功能1、功能2的结果，首次使用时创建（见session）
+        self._session = None
+        
+        # 后台任务：生成文件在线程中运行，界面保持响应
+        self.jobs = JobRunner(self.root, self.on_job_message)
+        
         # 创建主界面
         self.create_main_ui()
         
@@ -33,15 +41,18 @@ class ResultProcessor:
 
     def on_closing(self):
         """主窗口关闭事件处理"""
-        if messagebox.askokcancel("退出", "确定要退出程序吗？"):
+        message = "确定要退出程序吗？"
+        if self.jobs.active_jobs():
+            message = "仍有任务在运行，确定要取消并退出吗？"
+        if messagebox.askokcancel("退出", message):
             self.cleanup()
     
     def cleanup(self):
-        """清理资源并退出程序"""
+        """取消后台任务并退出程序"""
+        self.jobs.shutdown()
         if hasattr(self, 'processing_window'):
             self.processing_window.destroy()
         self.root.destroy()
-        os._exit(0)  # 强制结束所有进程
 
     def create_main_ui(self):
         """创建主界面"""
@@ -54,6 +65,17 @@ class ResultProcessor:
                   command=self.start_function1).pack(pady=5)
         ttk.Button(main_frame, text="功能2：不同ECC高度对应的最大应变",
                   command=self.start_function2).pack(pady=5)
+        
+        # 会话快照：保存已选择、已解析的文件和计算结果，下次打开时无需重新选择和解析
+        session_frame = ttk.Frame(main_frame)
+        session_frame.pack(pady=5)
+        ttk.Button(session_frame, text="保存会话",
+                   command=self.save_session).pack(side="left", padx=5)
+        ttk.Button(session_frame, text="打开会话",
+                   command=self.open_session).pack(side="left", padx=5)
+        
+        self.job_panel = JobPanel(main_frame, self.jobs)
+        self.job_panel.pack(fill="both", expand=True, pady=10)
     
     def create_processing_ui(self):
         """创建处理界面"""
@@ -74,7 +96,8 @@ class ResultProcessor:
         ttk.Label(a_frame, text="选择要使用的A元素：").pack(side="left")
         self.a_vars = []
         for a in self.array_A:
-            var = tk.BooleanVar()
+            # 已选择文件的A元素默认勾选，再次进入时无需重新选择
+            var = tk.BooleanVar(value=a in self.selected_files)
             self.a_vars.append(var)
             ttk.Checkbutton(a_frame, text=str(a), variable=var).pack(side="left", padx=5)
         
@@ -100,6 +123,17 @@ class ResultProcessor:
                     ttk.Checkbutton(row_frame, text=self.array_B[i + j],
                                   variable=var).pack(side="left", padx=10)
         
+        # 输出格式：除文本表格外可同时输出npz，文本可固定小数位数
+        format_frame = ttk.LabelFrame(self.processing_window, text="输出格式", padding="5")
+        format_frame.pack(fill="x", padx=5, pady=5)
+        
+        self.npz_var = tk.BooleanVar()
+        ttk.Checkbutton(format_frame, text="同时输出npz文件",
+                        variable=self.npz_var).pack(side="left", padx=5)
+        ttk.Label(format_frame, text="小数位数（留空为原样输出）：").pack(side="left", padx=5)
+        self.precision_var = tk.StringVar()
+        ttk.Entry(format_frame, textvariable=self.precision_var, width=5).pack(side="left")
+        
         # 输出部分
         output_frame = ttk.Frame(self.processing_window)
         output_frame.pack(fill="x", padx=5, pady=5)
@@ -144,7 +178,7 @@ class ResultProcessor:
         
         file_path = filedialog.askopenfilename(
             title=f"选择 {unselected[0]} 对应的results文件",
-            filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")]
+            filetypes=[("文本文件", "*.txt"), ("npz文件", "*.npz"), ("所有文件", "*.*")]
         )
         
         if file_path:
@@ -152,60 +186,73 @@ class ResultProcessor:
             self.update_file_list()
     
     def reset_selection(self):
-        """重置文件选择"""
+        """重置文件选择，已解析的文件仍保留在会话中，再次选择时无需重新解析"""
         self.selected_files.clear()
         self.update_file_list()
     
-    def read_results_file(self, file_path):
-        """读取results文件内容"""
+    @property
+    def session(self):
+        """常驻内存的ResultsSession，首次使用时才导入NumPy和results_cube"""
+        if self._session is None:
+            from results_session import ResultsSession
+            self._session = ResultsSession()
+        return self._session
+    
+    def save_session(self):
+        """将当前选择的文件、已解析的表格和计算结果保存为会话快照"""
+        if not self.selected_files:
+            messagebox.showwarning("警告", "还没有选择results文件！")
+            return
+        from results_session import SESSION_SUFFIX
+        path = filedialog.asksaveasfilename(
+            title="保存会话", defaultextension=SESSION_SUFFIX,
+            filetypes=[("会话文件", f"*{SESSION_SUFFIX}"), ("所有文件", "*.*")])
+        if not path:
+            return
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-                # 获取表头（B列标题）
-                headers = lines[0].strip().split('\t')
-                # 获取第一列
-                first_column = [line.split('\t')[0] for line in lines[1:]]
-                # 获取指定的B列数据
-                b_columns = {}
-                b_indices = [i for i, h in enumerate(headers) if h.startswith('B')]
-                for i, b_val in enumerate(self.array_B):
-                    if i < len(b_indices):
-                        col_idx = b_indices[i]
-                        b_columns[b_val] = [line.strip().split('\t')[col_idx] 
-                                          for line in lines[1:]]
-                return first_column, b_columns
+            self.session.files = dict(self.selected_files)
+            self.session.preload()
+            self.session.save(path)
         except Exception as e:
-            messagebox.showerror("错误", f"读取文件 {file_path} 时出错：{str(e)}")
-            return None, None
+            messagebox.showerror("错误", f"保存会话时出错：{str(e)}")
+            return
+        messagebox.showinfo("成功", f"会话已保存到：{path}")
+    
+    def open_session(self):
+        """打开会话快照，恢复所选文件，未修改的文件不再重新解析"""
+        from results_session import SESSION_SUFFIX, ResultsSession
+        path = filedialog.askopenfilename(
+            title="打开会话",
+            filetypes=[("会话文件", f"*{SESSION_SUFFIX}"), ("所有文件", "*.*")])
+        if not path:
+            return
+        try:
+            self._session = ResultsSession.load(path)
+        except Exception as e:
+            messagebox.showerror("错误", f"打开会话时出错：{str(e)}")
+            return
+        self.selected_files = dict(self._session.files)
+        messagebox.showinfo("成功", f"已恢复 {len(self.selected_files)} 个results文件")
+    
+    def build_results_cube(self, files=None):
+        """由{A值: 文件路径}构建ResultsCube（ECC高度 × B列 × 纤维位置），默认使用当前选择的文件
 
-    def process_strain_data(self, X, b, selected_a):
-        """处理应变数据，实现功能2的核心逻辑"""
-        result_rc = []  # RC行数据
-        result_ecc = []  # ECC行数据
-        
-        # 获取X中的第一列数据（C数组）
-        c_values = [float(x) for x in X[0]]  # 假设X[0]是第一列数据
-        
-        for a in selected_a:
-            a_col_idx = selected_a.index(a) + 1  # +1因为第一列是C值
-            col_data = [float(x) if x != "error" else float('-inf') for x in X[a_col_idx]]
-            
-            # 计算y1：c*10 ≤ a的行中最大值
-            y1 = float('-inf')
-            for c, val in zip(c_values, col_data):
-                if c * 10 <= a:
-                    y1 = max(y1, val)
-            
-            # 计算y2：a ≤ c*10的行中最大值
-            y2 = float('-inf')
-            for c, val in zip(c_values, col_data):
-                if a <= c * 10:
-                    y2 = max(y2, val)
-            
-            result_rc.append(str(y1) if y1 != float('-inf') else "error")
-            result_ecc.append(str(y2) if y2 != float('-inf') else "error")
-        
-        return result_rc, result_ecc
+        文件只在首次使用或被修改后解析，见ResultsSession。
+        """
+        files = self.selected_files if files is None else files
+        return self.session.cube(files)
+    
+    def intensity_labels(self, cube, selected_b):
+        """按位置将b值（0.1g…）对应到立方体中以B开头的强度标签（按B编号排序），没有对应列的为None"""
+        b_labels = [label for label in cube.intensities if label.startswith('B')]
+        positions = [self.array_B.index(b) for b in selected_b]
+        return [b_labels[i] if i < len(b_labels) else None for i in positions]
+
+    @staticmethod
+    def format_strain(value):
+        """格式化最大应变值，被屏蔽的值输出为error"""
+        import numpy as np
+        return "error" if value is np.ma.masked else str(float(value))
 
     def generate_output(self):
         """生成输出文件"""
@@ -224,90 +271,96 @@ class ResultProcessor:
             messagebox.showwarning("警告", "请选择至少一个b元素！")
             return
         
+        precision = self.precision_var.get().strip()
+        if precision and not precision.isdigit():
+            messagebox.showwarning("警告", "小数位数必须为非负整数！")
+            return
+        # (格式, 小数位数)，与results_writer.OutputOptions的字段顺序一致
+        output = (('tsv', 'npz') if self.npz_var.get() else ('tsv',),
+                  int(precision) if precision else None)
+        
         # 选择输出目录
         output_dir = filedialog.askdirectory(title="选择输出目录")
         if not output_dir:
             return
             
-        try:
-            if hasattr(self, 'current_function') and self.current_function == 2:
-                self.generate_function2_output(selected_a, selected_b, output_dir)
-            else:
-                self.generate_function1_output(selected_a, selected_b, output_dir)
-            
-            messagebox.showinfo("成功", f"文件已生成到：{output_dir}")
-            self.return_to_main()  # 处理完成后返回主界面
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"生成文件时出错：{str(e)}")
+        # 在后台线程中生成，文件选择在提交时复制，之后修改选择不影响该任务
+        function = getattr(self, 'current_function', 1)
+        files = {a: self.selected_files[a] for a in selected_a}
+        self.jobs.submit(f"功能{function} → {os.path.basename(output_dir)}",
+                         self.run_function, function, selected_a, selected_b, output_dir, files,
+                         output)
+        self.return_to_main()  # 提交后返回主界面，可继续提交其他任务
+    
+    def run_function(self, job, function, selected_a, selected_b, output_dir, files,
+                     output=None):
+        """后台任务：生成功能1或功能2的输出文件，返回输出目录"""
+        if function == 2:
+            self.generate_function2_output(selected_a, selected_b, output_dir, files, job, output)
+        else:
+            self.generate_function1_output(selected_a, selected_b, output_dir, files, job, output)
+        return output_dir
     
-    def generate_function1_output(self, selected_a, selected_b, output_dir):
-        """生成功能1的输出文件"""
-        # 读取第一个文件以获取first_column
-        first_file = self.selected_files[selected_a[0]]
-        first_column, _ = self.read_results_file(first_file)
-        if not first_column:
+    def on_job_message(self, job, kind, payload):
+        """在主线程中处理后台任务的消息"""
+        self.job_panel.update_job(job, kind, payload)
+        if kind == "done":
+            messagebox.showinfo("成功", f"文件已生成到：{payload}")
+        elif kind == "error":
+            messagebox.showerror("错误", f"生成文件时出错：{str(payload)}")
+    
+    def generate_function1_output(self, selected_a, selected_b, output_dir, files=None, job=None,
+                                  output=None):
+        """生成功能1的输出文件，job为后台任务时报告进度并响应取消
+
+        output为(格式, 小数位数)，见results_writer.OutputOptions，默认只输出文本表格；
+        全部b值的表格在最后一次写出，npz格式合并为strain_distribution.npz。
+        """
+        files = self.selected_files if files is None else files
+        files = {a: files[a] for a in selected_a}
+        cube = self.build_results_cube(files)
+        if not cube.positions:
             return
         
-        # 为每个选中的b元素生成输出文件
-        for b in selected_b:
-            output_filename = f"strain_distribution_{b}.txt"
-            output_path = os.path.join(output_dir, output_filename)
+        from results_writer import DEFAULT_OUTPUT, ResultsWriter
+        writer = ResultsWriter(output_dir, "strain_distribution", *(output or DEFAULT_OUTPUT))
+        # 为每个选中的b元素生成一个表格
+        for k, (b, label) in enumerate(zip(selected_b, self.intensity_labels(cube, selected_b))):
+            if job is not None:
+                job.check_cancelled()
+                job.post("progress", f"{k}/{len(selected_b)} 个b值")
             
-            with open(output_path, 'w') as f:
-                # 写入表头
-                header = ['b\\a'] + [str(a) for a in selected_a]
-                f.write('\t'.join(header) + '\n')
-                
-                # 获取每个文件中对应b的数据
-                for row_idx, row_label in enumerate(first_column):
-                    row = [row_label]
-                    for a in selected_a:
-                        file_path = self.selected_files[a]
-                        _, b_data = self.read_results_file(file_path)
-                        if b_data and b in b_data:
-                            row.append(b_data[b][row_idx])
-                        else:
-                            row.append("error")
-                    f.write('\t'.join(row) + '\n')
+            # 立方体中该强度的切片：(纤维位置 × A值)，同一(A集合, b)只计算一次
+            values, cells = self.session.distribution(files, label)
+            writer.add(f"strain_distribution_{b}", cube.positions, selected_a, values, cells)
+        writer.write()
 
-    def generate_function2_output(self, selected_a, selected_b, output_dir):
-        """生成功能2的输出文件"""
-        # 首先获取功能1的数据（但不输出）
-        for b in selected_b:
-            # 构建数据矩阵X
-            X = []
-            
-            # 读取第一个文件以获取first_column
-            first_file = self.selected_files[selected_a[0]]
-            first_column, _ = self.read_results_file(first_file)
-            if not first_column:
-                return
-            
-            # 添加第一列（C数组值）
-            X.append(first_column)
-            
-            # 获取所有A值对应的数据列
-            for a in selected_a:
-                file_path = self.selected_files[a]
-                _, b_data = self.read_results_file(file_path)
-                if b_data and b in b_data:
-                    X.append(b_data[b])
-                else:
-                    X.append(["error"] * len(first_column))
-            
-            # 处理数据并生成输出
-            result_rc, result_ecc = self.process_strain_data(X, b, selected_a)
-            
-            # 生成输出文件
-            output_filename = f"max_strain_{b}.txt"
-            output_path = os.path.join(output_dir, output_filename)
-            
-            with open(output_path, 'w') as f:
-                # 写入每个A值一行
-                for i, a in enumerate(selected_a):
-                    row = [str(a), result_ecc[i], result_rc[i]]  # ECC在前，RC在后
-                    f.write('\t'.join(row) + '\n')
+    def generate_function2_output(self, selected_a, selected_b, output_dir, files=None, job=None,
+                                  output=None):
+        """生成功能2的输出文件，job为后台任务时报告进度并响应取消
+
+        全部b值的表格在最后一次写出，npz格式合并为max_strain.npz。
+        """
+        files = self.selected_files if files is None else files
+        # 一次归约所有A值和尚未计算过的b值（功能1的数据，但不输出）
+        files = {a: files[a] for a in selected_a}
+        cube = self.build_results_cube(files)
+        result_rc, result_ecc = self.session.rc_ecc(files, self.intensity_labels(cube, selected_b))
+        
+        import numpy as np
+        from results_writer import DEFAULT_OUTPUT, ResultsWriter
+        writer = ResultsWriter(output_dir, "max_strain", *(output or DEFAULT_OUTPUT))
+        for k, b in enumerate(selected_b):
+            if job is not None:
+                job.check_cancelled()
+                job.post("progress", f"{k}/{len(selected_b)} 个b值")
+            # 每个A值一行，ECC在前，RC在后，不写表头
+            columns = (result_ecc[:, k], result_rc[:, k])
+            text = [[self.format_strain(column[i]) for column in columns]
+                    for i in range(len(selected_a))]
+            values = np.ma.column_stack(columns).astype(float).filled(np.nan)
+            writer.add(f"max_strain_{b}", selected_a, ["ECC", "RC"], values, text, header=False)
+        writer.write()
     
     def start_function1(self):
         """启动功能1"""
@@ -324,6 +377,9 @@ class ResultProcessor:
     def run(self):
         self.root.mainloop()
 
-if __name__ == "__main__":
+def main():
     app = ResultProcessor()
     app.run()
+
+if __name__ == "__main__":
+    main()
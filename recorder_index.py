@@ -0,0 +1,74 @@
+import os
+import re
+from collections import namedtuple
+
+# 默认的文件名模板，如S2_B12_IDA_8.5MPa_barfiber-6.5.out、S2_B12_IDA_8.5MPa_disp.out
+DEFAULT_TEMPLATE = "{specimen}_B{a}_IDA_{load}MPa_{channel}{b}.out"
+# 模板字段对应的正则表达式，未列出的字段匹配任意非空文本
+FIELD_PATTERNS = {
+    'specimen': r'[^_]+',
+    'a': r'\d+',
+    'load': r'[-.0-9]+',
+    'channel': r'[A-Za-z]+',
+    'b': r'[-.0-9]*',
+}
+
+# 单个记录文件：试件、记录编号（序号a的数字部分）、轴压、通道、位置（序号b，无则为None）、路径
+RecordEntry = namedtuple('RecordEntry',
+                         ['specimen', 'record', 'load', 'channel', 'position', 'path'])
+
+def compile_template(template):
+    """将{字段}形式的文件名模板编译为正则表达式"""
+    regex = ''
+    pos = 0
+    for match in re.finditer(r'\{(\w+)\}', template):
+        name = match.group(1)
+        regex += re.escape(template[pos:match.start()])
+        regex += f"(?P<{name}>{FIELD_PATTERNS.get(name, '.+?')})"
+        pos = match.end()
+    regex += re.escape(template[pos:])
+    return re.compile(regex + '$')
+
+def parse_filename(filename, template=DEFAULT_TEMPLATE):
+    """按模板从文件名解析元数据，返回字段字典，不符合模板时返回None"""
+    regex = template if isinstance(template, re.Pattern) else compile_template(template)
+    match = regex.match(filename)
+    if not match:
+        return None
+    fields = match.groupdict()
+    position = fields.get('b')
+    try:
+        position = float(position) if position else None
+    except ValueError:  # 如"-"或"1.2.3"
+        return None
+    return {
+        'specimen': fields.get('specimen'),
+        'record': fields.get('a'),
+        'load': fields.get('load'),
+        'channel': fields.get('channel'),
+        'position': position,
+    }
+
+class FolderIndex:
+    """一次扫描文件夹建立的记录文件索引，(试件, 记录, 轴压, 通道, 位置) → 路径"""
+
+    def __init__(self, folder_path, template=DEFAULT_TEMPLATE):
+        self.folder_path = folder_path
+        self.template = template
+        regex = compile_template(template)
+        self.entries = []
+        for filename in sorted(os.listdir(folder_path)):
+            meta = parse_filename(filename, regex)
+            if meta is not None:
+                self.entries.append(
+                    RecordEntry(path=os.path.join(folder_path, filename), **meta))
+
+    def query(self, **conditions):
+        """按字段筛选记录，值为None的条件不参与筛选，结果按文件名排序"""
+        conditions = {k: v for k, v in conditions.items() if v is not None}
+        return [entry for entry in self.entries
+                if all(getattr(entry, k) == v for k, v in conditions.items())]
+
+    def channels(self):
+        """索引中出现的全部通道名"""
+        return sorted({entry.channel for entry in self.entries})
@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+import warnings
+from collections import namedtuple
+from recorder_index import DEFAULT_TEMPLATE, parse_filename
+
+# NumPy在转换或打开列式数组时才导入，只按块读取文本时不加载
+# 每次读取的字节数，决定单块内存占用的上限
+CHUNK_BYTES = 4 * 1024 * 1024
+# 列式存储目录名，位于被转换的文件夹中
+STORE_DIRNAME = ".columnar"
+MANIFEST_FILENAME = "manifest.json"
+STORE_VERSION = 1
+# 校验检查点时，对文件开头和检查点之前各取的字节数
+CHECK_BYTES = 64 * 1024
+
+# 追加读取的检查点：已读到的字节偏移（完整行末尾）、已读行数、
+# 已读部分的校验哈希（见prefix_hash）和JSON格式的归约状态（不使用pickle，
+# 缓存文件位于可能共享的数据文件夹中，读取时不能执行其中的代码）
+Checkpoint = namedtuple('Checkpoint', ['offset', 'lines', 'sha1', 'state'])
+
+def iter_line_blocks(f, chunk_bytes=CHUNK_BYTES):
+    """按块读取文本文件，每块只包含完整的行，返回(起始行号, 行列表)"""
+    line_num = 1
+    tail = ''
+    while True:
+        data = f.read(chunk_bytes)
+        if not data:
+            break
+        data = tail + data
+        cut = data.rfind('\n') + 1
+        if cut == 0:  # 当前块内没有换行，继续读取
+            tail = data
+            continue
+        tail = data[cut:]
+        lines = data[:cut - 1].split('\n')
+        yield line_num, lines
+        line_num += len(lines)
+    if tail:
+        yield line_num, [tail]
+
+def iter_byte_blocks(f, first_line_num=1, chunk_bytes=CHUNK_BYTES, hasher=None):
+    """从二进制文件的当前位置按块读取完整的行，返回(起始行号, 行列表, 块末尾的字节偏移)
+
+    行按latin-1解码，字符与字节一一对应；文件末尾没有换行的最后一行（可能仍在写入）
+    单独返回，其字节偏移为None。hasher（如hashlib.sha1()）不为None时用读到的全部字节更新，
+    读完后即为所读部分的内容哈希，无需再次读取文件。
+    """
+    offset = f.tell()
+    line_num = first_line_num
+    tail = b''
+    while True:
+        data = f.read(chunk_bytes)
+        if not data:
+            break
+        if hasher is not None:
+            hasher.update(data)
+        data = tail + data
+        cut = data.rfind(b'\n') + 1
+        if cut == 0:  # 当前块内没有换行，继续读取
+            tail = data
+            continue
+        tail = data[cut:]
+        offset += cut
+        lines = data[:cut - 1].decode('latin-1').split('\n')
+        yield line_num, lines, offset
+        line_num += len(lines)
+    if tail:
+        yield line_num, [tail.decode('latin-1')], None
+
+def prefix_hash(f, offset):
+    """文件开头和offset之前各CHECK_BYTES字节的SHA-1，用于判断已读部分是否被改写"""
+    h = hashlib.sha1()
+    f.seek(0)
+    h.update(f.read(min(CHECK_BYTES, offset)))
+    start = max(0, offset - CHECK_BYTES)
+    f.seek(start)
+    h.update(f.read(offset - start))
+    return h.hexdigest()
+
+def resume_point(f, checkpoint):
+    """文件在检查点之后只是追加了内容时返回checkpoint，被截断或改写时返回None"""
+    if checkpoint is None:
+        return None
+    if os.fstat(f.fileno()).st_size < checkpoint.offset:
+        return None
+    if prefix_hash(f, checkpoint.offset) != checkpoint.sha1:
+        return None
+    return checkpoint
+
+def store_dir(folder_path):
+    """文件夹对应的列式存储目录"""
+    return os.path.join(folder_path, STORE_DIRNAME)
+
+def load_manifest(folder_path):
+    """读取文件夹的列式存储清单，不存在时返回None"""
+    manifest_path = os.path.join(store_dir(folder_path), MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != STORE_VERSION:
+        return None
+    return manifest
+
+def convert_file(file_path, array_path, dtype='float64', chunk_bytes=CHUNK_BYTES):
+    """将文本记录文件转换为.npy，返回(行数, 列数)
+
+    文件中存在无法解析或列数不一致的行时抛出ValueError。
+    """
+    import numpy as np
+    tmp_path = array_path + ".tmp"
+    rows = 0
+    columns = None
+    try:
+        with open(file_path, 'r') as f_in, open(tmp_path, 'wb') as f_tmp:
+            for first_line_num, lines in iter_line_blocks(f_in, chunk_bytes):
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")  # 全空块会触发空输入警告
+                    block = np.loadtxt(lines, comments=None, ndmin=2)
+                if block.size == 0:
+                    continue
+                if columns is None:
+                    columns = block.shape[1]
+                elif block.shape[1] != columns:
+                    raise ValueError(f"第{first_line_num}行附近列数由{columns}变为{block.shape[1]}")
+                block.astype(dtype).tofile(f_tmp)
+                rows += block.shape[0]
+
+        columns = columns or 0
+        if rows == 0:
+            np.save(array_path, np.empty((0, columns), dtype=dtype))
+            return rows, columns
+        # 先写原始数据再补上.npy头，转换时内存占用与文件大小无关
+        out = np.lib.format.open_memmap(array_path, mode='w+', dtype=dtype,
+                                        shape=(rows, columns))
+        raw = np.memmap(tmp_path, dtype=dtype, mode='r', shape=(rows, columns))
+        step = max(1, chunk_bytes // (columns * np.dtype(dtype).itemsize))
+        for start in range(0, rows, step):
+            out[start:start + step] = raw[start:start + step]
+        out.flush()
+        del raw, out
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows, columns
+
+def convert_folder(folder_path, dtype='float64', force=False, template=DEFAULT_TEMPLATE):
+    """将文件夹中的.out文件转换为列式存储，返回清单
+
+    清单中记录按template从文件名解析的元数据；源文件未变化的条目不会重复转换；
+    含有格式错误行的文件保留为文本，并在清单中记录原因。
+    """
+    import numpy as np
+    os.makedirs(store_dir(folder_path), exist_ok=True)
+    old_manifest = None if force else load_manifest(folder_path)
+    old_files = old_manifest['files'] if old_manifest else {}
+    dtype_name = np.dtype(dtype).name
+
+    files = {}
+    for filename in sorted(os.listdir(folder_path)):
+        if not filename.endswith('.out'):
+            continue
+        file_path = os.path.join(folder_path, filename)
+        stat = os.stat(file_path)
+        entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        entry.update(parse_filename(filename, template) or {})
+
+        old = old_files.get(filename)
+        if (old and old['size'] == entry['size'] and old['mtime_ns'] == entry['mtime_ns']
+                and old.get('dtype', dtype_name) == dtype_name):
+            files[filename] = old
+            continue
+
+        array_name = os.path.splitext(filename)[0] + ".npy"
+        try:
+            rows, columns = convert_file(
+                file_path, os.path.join(store_dir(folder_path), array_name), dtype)
+        except ValueError as e:
+            entry['error'] = str(e)
+        else:
+            entry.update(array=array_name, dtype=dtype_name, rows=rows, columns=columns)
+        files[filename] = entry
+
+    # 删除已不存在的源文件对应的数组
+    for filename, old in old_files.items():
+        if filename not in files and 'array' in old:
+            array_path = os.path.join(store_dir(folder_path), old['array'])
+            if os.path.exists(array_path):
+                os.remove(array_path)
+
+    manifest = {'version': STORE_VERSION, 'files': files}
+    manifest_path = os.path.join(store_dir(folder_path), MANIFEST_FILENAME)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return manifest
+
+def open_columnar(file_path):
+    """以np.memmap打开文件对应的列式数组
+
+    没有转换过、转换失败、源文件在转换后被修改，或数组文件缺失、被截断、无法读取时返回None，
+    调用方应回退到文本解析。
+    """
+    folder_path, filename = os.path.split(file_path)
+    manifest = load_manifest(folder_path)
+    if manifest is None:
+        return None
+    entry = manifest['files'].get(filename)
+    if not entry or 'array' not in entry:
+        return None
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    if stat.st_size != entry['size'] or stat.st_mtime_ns != entry['mtime_ns']:
+        return None
+    import numpy as np
+    array_path = os.path.join(store_dir(folder_path), entry['array'])
+    try:
+        if entry['rows'] == 0:
+            array = np.load(array_path)  # 空数组无法内存映射
+        else:
+            array = np.load(array_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if array.shape != (entry['rows'], entry['columns']):
+        return None
+    return array
+
+def record_width(file_path):
+    """文件的列数，取自列式数组或文本的第一个非空行，文件为空或无法读取时返回None"""
+    array = open_columnar(file_path)
+    if array is not None:
+        return array.shape[1]
+    try:
+        with open(file_path, 'rb') as f:
+            for line in f:
+                if line.split():
+                    return len(line.split())
+    except OSError:
+        pass
+    return None
+
+def main(argv=None):
+    """命令行入口：python recorder_store.py 文件夹 [文件夹 ...] [--dtype float32]"""
+    parser = argparse.ArgumentParser(description="将OpenSees记录文件转换为列式二进制存储")
+    parser.add_argument("folders", nargs="+", help="包含.out文件的文件夹")
+    parser.add_argument("--dtype", choices=["float64", "float32"], default="float64",
+                        help="存储精度（默认：%(default)s；float32体积减半但会损失精度）")
+    parser.add_argument("--force", action="store_true", help="忽略已有清单，全部重新转换")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for folder_path in args.folders:
+        try:
+            manifest = convert_folder(folder_path, args.dtype, args.force)
+        except OSError as e:
+            print(f"转换文件夹 {folder_path} 时出错：{str(e)}", file=sys.stderr)
+            failures += 1
+            continue
+        converted = sum(1 for entry in manifest['files'].values() if 'array' in entry)
+        print(f"{folder_path}: 已转换 {converted}/{len(manifest['files'])} 个文件")
+        for filename, entry in manifest['files'].items():
+            if 'error' in entry:
+                print(f"  未转换 {filename}: {entry['error']}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+import time
+import json
+import hashlib
+import warnings
+import numpy as np
+from line_errors import DEFAULT_LIMITS, LineErrors, errors_state, parse_lines, restore_errors
+from recorder_store import (CHUNK_BYTES, Checkpoint, iter_byte_blocks, open_columnar,
+                            prefix_hash, resume_point)
+
+class MaxAbs:
+    """各列的最大绝对值"""
+    scaled = True
+    timed = False
+
+    def __init__(self):
+        self.value = None
+
+    def update(self, block):
+        block_max = np.abs(block).max(axis=0)
+        self.value = block_max if self.value is None else np.maximum(self.value, block_max)
+
+    def result(self):
+        return self.value
+
+class PeakTime:
+    """各列绝对值达到最大时对应的时间（第一列），并列时取最早出现的时刻
+
+    只有一列的文件（如acc101）没有时间列，结果为None（表格中为error）。
+    """
+    scaled = False
+    timed = True
+
+    def __init__(self):
+        self.peak = None
+        self.time = None
+
+    def update(self, block):
+        if block.shape[1] < 2:
+            return
+        abs_block = np.abs(block)
+        idx = abs_block.argmax(axis=0)
+        peak = abs_block[idx, np.arange(block.shape[1])]
+        time = block[idx, 0]
+        if self.peak is None:
+            self.peak, self.time = peak, time
+        else:
+            later = peak > self.peak
+            self.peak = np.where(later, peak, self.peak)
+            self.time = np.where(later, time, self.time)
+
+    def result(self):
+        return self.time
+
+class RMS:
+    """各列的均方根值"""
+    scaled = True
+    timed = False
+
+    def __init__(self):
+        self.sum_sq = None
+        self.count = 0
+
+    def update(self, block):
+        sum_sq = np.square(block).sum(axis=0)
+        self.sum_sq = sum_sq if self.sum_sq is None else self.sum_sq + sum_sq
+        self.count += block.shape[0]
+
+    def result(self):
+        if self.sum_sq is None:
+            return None
+        return np.sqrt(self.sum_sq / self.count)
+
+class Residual:
+    """记录结束时各列的值（残余值）"""
+    scaled = True
+    timed = False
+
+    def __init__(self):
+        self.value = None
+
+    def update(self, block):
+        self.value = block[-1].copy()
+
+    def result(self):
+        return self.value
+
+class WindowMax:
+    """时间窗口[start, end]内各列的最大绝对值，时间取自第一列，没有时间列时同PeakTime"""
+    scaled = True
+    timed = True
+
+    def __init__(self, start, end):
+        self.start = float(start)
+        self.end = float(end)
+        self.value = None
+
+    def update(self, block):
+        if block.shape[1] < 2:
+            return
+        in_window = (block[:, 0] >= self.start) & (block[:, 0] <= self.end)
+        if in_window.any():
+            block_max = np.abs(block[in_window]).max(axis=0)
+            self.value = block_max if self.value is None else np.maximum(self.value, block_max)
+
+    def result(self):
+        return self.value
+
+# 统计量名称 → 类；带参数的统计量写作"名称:参数1:参数2"，如window_max:10:20；
+# scaled为结果是否乘以放大系数，timed为是否需要第一列的时间
+STATISTICS = {
+    'maxabs': MaxAbs,
+    'peak_time': PeakTime,
+    'rms': RMS,
+    'residual': Residual,
+    'window_max': WindowMax,
+}
+
+def make_statistic(spec):
+    """根据描述字符串创建统计量对象，名称或参数无效时抛出ValueError"""
+    name, *params = spec.split(':')
+    if name not in STATISTICS:
+        raise ValueError(f"未知的统计量：{name}（可选：{', '.join(STATISTICS)}）")
+    try:
+        return STATISTICS[name](*params)
+    except TypeError:
+        raise ValueError(f"统计量 {spec} 的参数个数不正确")
+
+def encode_field(value):
+    """统计量字段的JSON表示，数组保存为{"array": 列表}（浮点数可精确往返）"""
+    if isinstance(value, np.ndarray):
+        return {'array': value.tolist()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def stats_state(stats):
+    """{spec: 统计量对象}的运行状态（可写为JSON），见restore_stats"""
+    return {spec: {name: encode_field(value) for name, value in vars(stat).items()}
+            for spec, stat in stats.items()}
+
+def restore_stats(state):
+    """由stats_state的结果恢复{spec: 统计量对象}"""
+    stats = {}
+    for spec, fields in state.items():
+        stat = make_statistic(spec)
+        for name, value in fields.items():
+            if isinstance(value, dict):
+                value = np.array(value['array'], dtype=float)
+            setattr(stat, name, value)
+        stats[spec] = stat
+    return stats
+
+def checkpoint_state(stats, errors, width):
+    """检查点中保存的归约状态（JSON文本）"""
+    return json.dumps({'stats': stats_state(stats), 'errors': errors_state(errors),
+                       'width': width}, ensure_ascii=False)
+
+def parse_rows(lines, first_line_num, errors, width=None):
+    """批量解析一块行的全部列，返回(二维数组, 列数)
+
+    失败时逐行解析：含有无法转换的值，或列数与文件首个有效行不一致的行记入errors（LineErrors）。
+    """
+    state = {'width': width}
+
+    def load_block(part):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # 全空块会触发空输入警告
+            block = np.loadtxt(part, comments=None, ndmin=2)
+        if block.size:
+            if state['width'] is None:
+                state['width'] = block.shape[1]
+            elif block.shape[1] != state['width']:
+                raise ValueError("列数不一致")
+        return block
+
+    def load_line(parts):
+        row = [float(x) for x in parts]
+        if state['width'] is None:
+            state['width'] = len(row)
+        elif len(row) != state['width']:
+            raise ValueError("列数不一致")
+        return row
+
+    rows = parse_lines(lines, first_line_num, load_block, load_line, errors)
+    width = state['width']
+    return np.asarray(rows, dtype=float).reshape(len(rows), width or 0), width
+
+def iter_columnar_blocks(array, chunk_bytes=CHUNK_BYTES):
+    """分块读取内存映射数组，依次返回二维数组"""
+    if array.shape[0] and array.shape[1]:
+        step = max(1, chunk_bytes // (array.shape[1] * array.itemsize))
+        for start in range(0, array.shape[0], step):
+            yield np.asarray(array[start:start + step], dtype=float)
+
+def reduce_file_stats(file_path, specs, chunk_bytes=CHUNK_BYTES, info=None,
+                      limits=DEFAULT_LIMITS, checkpoint=None):
+    """单次流式读取文件，计算specs中的全部统计量
+
+    返回({spec: 各列结果数组，无数据时为None}, 错误行)，错误行为LineErrors；
+    连续错误行达到limits.abort_after时放弃该文件，全部结果为None。
+    已转换为列式存储的文件从内存映射数组读取，否则解析文本；
+    checkpoint为上次读取结束时的Checkpoint，文件只是追加了内容时从该处继续读取。
+    info为字典时填入读取字节数、行数、解析和归约的耗时，以及本次读取结束时的新检查点；
+    从头完整读取文本文件时还填入内容的SHA-1（sha1），供缓存比较。
+    """
+    if info is None:
+        info = {}
+    info.update(bytes=0, lines=0, parse_seconds=0.0, reduce_seconds=0.0)
+    stats = {spec: make_statistic(spec) for spec in specs}
+    errors = LineErrors(limits)
+    
+    array = open_columnar(file_path)
+    if array is not None:
+        info['bytes'] = array.nbytes
+        for block in iter_columnar_blocks(array, chunk_bytes):
+            start = time.perf_counter()
+            for stat in stats.values():
+                stat.update(block)
+            info['reduce_seconds'] += time.perf_counter() - start
+            info['lines'] += block.shape[0]
+        return {spec: stat.result() for spec, stat in stats.items()}, errors
+    
+    with open(file_path, 'rb') as f:
+        checkpoint = resume_point(f, checkpoint)
+        width = None
+        if checkpoint is None:
+            offset, lines_done = 0, 0
+        else:
+            # 只读取检查点之后追加的部分
+            offset, lines_done = checkpoint.offset, checkpoint.lines
+            state = json.loads(checkpoint.state)
+            stats = restore_stats(state['stats'])
+            errors = restore_errors(state['errors'], limits)
+            width = state['width']
+            info['resumed_bytes'] = offset
+        f.seek(offset)
+        saved = None  # 检查点对应的(偏移, 行数, 状态)
+        # 从头读取时顺便计算内容哈希
+        hasher = hashlib.sha1() if offset == 0 else None
+        blocks = iter_byte_blocks(f, lines_done + 1, chunk_bytes, hasher)
+        while True:
+            start = time.perf_counter()
+            item = next(blocks, None)
+            if item is None:
+                break
+            first_line_num, lines, end_offset = item
+            if end_offset is None:
+                # 最后一行没有换行，可能仍在写入，检查点保存在该行之前
+                saved = (offset, lines_done, checkpoint_state(stats, errors, width))
+            else:
+                offset, lines_done = end_offset, first_line_num + len(lines) - 1
+            block, width = parse_rows(lines, first_line_num, errors, width)
+            parsed = time.perf_counter()
+            info['parse_seconds'] += parsed - start
+            if block.size:
+                for stat in stats.values():
+                    stat.update(block)
+            info['reduce_seconds'] += time.perf_counter() - parsed
+            info['lines'] += len(lines)
+            if errors.aborted is not None:
+                break
+        info['bytes'] = f.tell() - info.get('resumed_bytes', 0)
+        if errors.aborted is not None:
+            return {spec: None for spec in stats}, errors
+        if saved is None:
+            saved = (offset, lines_done, checkpoint_state(stats, errors, width))
+        info['checkpoint'] = Checkpoint(saved[0], saved[1], prefix_hash(f, saved[0]), saved[2])
+        if hasher is not None:
+            info['sha1'] = hasher.hexdigest()
+    return {spec: stat.result() for spec, stat in stats.items()}, errors
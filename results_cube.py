@@ -0,0 +1,130 @@
+from collections import namedtuple
+import numpy as np
+from results_writer import format_cell, read_bundle
+
+# 解析后的results文件：行标题（纤维位置）、列标题（B编号）、原始单元格文本矩阵和数值矩阵
+ResultsTable = namedtuple('ResultsTable', ['row_labels', 'col_labels', 'cells', 'values'])
+
+def load_results_table(file_path):
+    """读取process_barfiber生成的b\\a结果表格，缺失的单元格按"error"处理
+
+    也可读取npz/parquet结果包（见results_writer），取其中第一个表格，无需解析文本。
+    """
+    if file_path.endswith((".npz", ".parquet")):
+        row_labels, col_labels, values = next(iter(read_bundle(file_path).values()))
+        cells = np.array([[format_cell(value) for value in row] for row in values],
+                         dtype=str).reshape(values.shape)
+        return ResultsTable(row_labels, col_labels, cells, values)
+    with open(file_path, 'r') as f:
+        lines = f.read().splitlines()
+    # 获取表头（B列标题）
+    headers = lines[0].strip().split('\t')
+    col_labels = headers[1:]
+    row_labels = []
+    rows = []
+    for line in lines[1:]:
+        row_labels.append(line.split('\t')[0])
+        parts = line.strip().split('\t')[1:]
+        parts += ["error"] * (len(col_labels) - len(parts))
+        rows.append(parts[:len(col_labels)])
+    cells = np.array(rows, dtype=str).reshape(len(rows), len(col_labels))
+
+    # 数值矩阵，无法转换的单元格（如"error"）记为NaN
+    values = np.full(cells.shape, np.nan)
+    for (i, j), cell in np.ndenumerate(cells):
+        try:
+            values[i, j] = float(cell)
+        except ValueError:
+            pass
+    return ResultsTable(row_labels, col_labels, cells, values)
+
+def intensity_key(label):
+    """强度标签的排序键：B记录按B后的编号排序，其他标签排在之后并保持原顺序"""
+    return (0, int(label[1:])) if label[:1] == 'B' and label[1:].isdigit() else (1, 0)
+
+def label_indices(labels, wanted):
+    """wanted中每个标签在labels中的位置，不存在的为-1"""
+    index = {label: i for i, label in enumerate(labels)}
+    return np.array([index.get(label, -1) for label in wanted], dtype=int)
+
+class ResultsCube:
+    """带标签的三维结果立方体：ECC高度 × 强度（B列） × 纤维位置
+
+    values为数值数组，"error"或缺失的单元格为NaN；cells保留原始文本，按原样写出。
+    纤维位置以第一个表格的行标题为准，其余表格按行标题对齐。
+    """
+
+    def __init__(self, heights, intensities, positions, values, cells):
+        self.heights = list(heights)
+        self.intensities = list(intensities)
+        self.positions = list(positions)
+        self.values = values
+        self.cells = cells
+
+    @classmethod
+    def from_tables(cls, tables):
+        """由{ECC高度: ResultsTable}构建，强度轴为全部表头的并集，按B后的编号排序
+
+        各表格的B记录不同时按标签对齐，表格中没有的单元格为NaN/"error"。
+        """
+        heights = list(tables)
+        positions = list(tables[heights[0]].row_labels) if heights else []
+        intensities = []
+        for table in tables.values():
+            intensities += [label for label in table.col_labels if label not in intensities]
+        intensities.sort(key=intensity_key)
+
+        shape = (len(heights), len(intensities), len(positions))
+        values = np.full(shape, np.nan)
+        cells = np.full(shape, "error", dtype=object)
+        for h, table in enumerate(tables.values()):
+            rows = label_indices(positions, table.row_labels)
+            cols = label_indices(intensities, table.col_labels)
+            keep = rows >= 0
+            # 立方体中的顺序为(强度, 位置)，表格为(位置, 强度)
+            values[h][np.ix_(cols, rows[keep])] = table.values[keep].T
+            cells[h][np.ix_(cols, rows[keep])] = table.cells[keep].T
+        return cls(heights, intensities, positions, values, cells)
+
+    @classmethod
+    def from_files(cls, files):
+        """由{ECC高度: results文件路径}读取并构建"""
+        return cls.from_tables({height: load_results_table(path)
+                                for height, path in files.items()})
+
+    def take(self, heights=None, intensities=None):
+        """按标签取出子立方体，不存在的高度或强度对应的单元格为NaN/"error\""""
+        heights = self.heights if heights is None else list(heights)
+        intensities = self.intensities if intensities is None else list(intensities)
+        h = label_indices(self.heights, heights)
+        i = label_indices(self.intensities, intensities)
+        shape = (len(heights), len(intensities), len(self.positions))
+        values = np.full(shape, np.nan)
+        cells = np.full(shape, "error", dtype=object)
+        hi = np.ix_(np.flatnonzero(h >= 0), np.flatnonzero(i >= 0))
+        src = np.ix_(h[h >= 0], i[i >= 0])
+        values[hi] = self.values[src]
+        cells[hi] = self.cells[src]
+        return ResultsCube(heights, intensities, self.positions, values, cells)
+
+    def position_values(self):
+        """纤维位置的数值"""
+        return np.array([float(p) for p in self.positions])
+
+    def distribution(self, intensity, heights=None):
+        """功能1：某一强度下各位置、各ECC高度的原始单元格文本，形状为(位置 × 高度)"""
+        return self.take(heights, [intensity]).cells[:, 0, :].T
+
+    def rc_ecc_max(self, heights=None, intensities=None):
+        """功能2：一次广播计算各ECC高度和强度的RC/ECC最大值
+
+        RC：位置*10 ≤ 高度的位置中的最大值；ECC：高度 ≤ 位置*10的位置中的最大值。
+        返回形状为(高度 × 强度)的两个掩码数组，没有有效数据的位置被屏蔽。
+        """
+        cube = self.take(heights, intensities)
+        position10 = cube.position_values()[None, None, :] * 10
+        height = np.asarray(cube.heights, dtype=float)[:, None, None]
+        missing = np.isnan(cube.values)
+        rc = np.ma.masked_array(cube.values, missing | ~(position10 <= height)).max(axis=2)
+        ecc = np.ma.masked_array(cube.values, missing | ~(height <= position10)).max(axis=2)
+        return rc, ecc
@@ -0,0 +1,165 @@
+import json
+import threading
+import numpy as np
+from barfiber_cache import file_fingerprint
+from results_cube import ResultsCube, ResultsTable, load_results_table
+
+# 会话快照的格式版本，格式改变时递增，旧快照不再读取（2：由pickle改为npz）
+SESSION_VERSION = 2
+SESSION_SUFFIX = ".npz"
+
+class ResultsSession:
+    """常驻内存的results会话：选择的文件只解析一次，功能1、功能2的结果按(A集合, b)缓存
+
+    files为当前选择的{A值: 文件路径}；tables按路径保存已解析的ResultsTable和文件指纹，
+    文件被修改后在下次使用时重新解析，并丢弃涉及该文件的缓存结果。
+    查询的键包含每个A值对应的文件路径，提交后修改选择不影响正在运行的任务；
+    后台任务可能同时查询，全部操作在锁内进行。
+    """
+
+    def __init__(self, files=None):
+        self.files = dict(files or {})
+        self.tables = {}  # {路径: (指纹, ResultsTable)}
+        self.memo = {}  # {(类型, ((A值, 路径), ...), 强度标签): 结果}
+        self.lock = threading.RLock()
+
+    def table(self, file_path):
+        """已解析的results表格，文件未变化时直接返回；快照中的文件已不存在时沿用快照中的表格"""
+        with self.lock:
+            cached = self.tables.get(file_path)
+            try:
+                key = file_fingerprint(file_path)
+            except OSError:
+                if cached is None:
+                    raise
+                return cached[1]
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            table = load_results_table(file_path)
+            if cached is not None:
+                self.forget(file_path)
+            self.tables[file_path] = (key, table)
+            return table
+
+    def forget(self, file_path):
+        """丢弃涉及该文件的缓存结果"""
+        with self.lock:
+            self.memo = {key: value for key, value in self.memo.items()
+                         if all(path != file_path for _, path in key[1])}
+
+    def preload(self, files=None):
+        """解析全部所选文件，之后的查询不再读取磁盘（文件被修改时除外）"""
+        files = self.files if files is None else files
+        for file_path in files.values():
+            self.table(file_path)
+
+    def cube(self, files):
+        """{A值: 路径}对应的ResultsCube，按A值的顺序排列，见ResultsCube.from_tables"""
+        with self.lock:
+            tables = {a: self.table(path) for a, path in files.items()}
+            key = ('cube', tuple(files.items()), None)
+            if key not in self.memo:
+                self.memo[key] = ResultsCube.from_tables(tables)
+            return self.memo[key]
+
+    def distribution(self, files, label):
+        """功能1：强度label下的(数值, 单元格文本)，形状均为(纤维位置 × A值)"""
+        with self.lock:
+            cube = self.cube(files)
+            key = ('distribution', tuple(files.items()), label)
+            if key not in self.memo:
+                sliced = cube.take(list(files), [label])
+                self.memo[key] = (sliced.values[:, 0, :].T, sliced.cells[:, 0, :].T)
+            return self.memo[key]
+
+    def rc_ecc(self, files, labels):
+        """功能2：各强度的RC/ECC最大值，返回(rc, ecc)，形状为(A值 × 强度)的掩码数组
+
+        只计算尚未缓存的强度，并按强度分别缓存。
+        """
+        import numpy as np
+
+        with self.lock:
+            cube = self.cube(files)
+            selection = tuple(files.items())
+            missing = [label for label in dict.fromkeys(labels)
+                       if ('rc_ecc', selection, label) not in self.memo]
+            if missing:
+                rc, ecc = cube.rc_ecc_max(list(files), missing)
+                for k, label in enumerate(missing):
+                    self.memo['rc_ecc', selection, label] = (rc[:, k], ecc[:, k])
+            columns = [self.memo['rc_ecc', selection, label] for label in labels]
+            return (np.ma.column_stack([rc for rc, _ in columns]),
+                    np.ma.column_stack([ecc for _, ecc in columns]))
+
+    def save(self, path):
+        """将会话（所选文件、已解析的表格和功能1、功能2的结果）保存为npz快照
+
+        表格和结果保存为标签、单元格文本、数值和掩码数组，文件和缓存键保存为JSON文本（manifest），
+        不使用pickle：会话文件可能位于共享文件夹中，读取时不能执行其中的代码。
+        立方体不保存，打开后由表格重新构建。
+        """
+        with self.lock:
+            arrays = {}
+            tables = []
+            for i, (file_path, (fingerprint, table)) in enumerate(self.tables.items()):
+                tables.append({'path': file_path, 'fingerprint': list(fingerprint)})
+                arrays[f'table{i}_rows'] = np.array(table.row_labels, dtype=str)
+                arrays[f'table{i}_cols'] = np.array(table.col_labels, dtype=str)
+                arrays[f'table{i}_cells'] = np.asarray(table.cells, dtype=str)
+                arrays[f'table{i}_values'] = np.asarray(table.values, dtype=float)
+            memo = []
+            for (kind, selection, label), value in self.memo.items():
+                if kind == 'cube':
+                    continue
+                j = len(memo)
+                memo.append({'kind': kind, 'selection': [list(item) for item in selection],
+                             'label': label})
+                if kind == 'distribution':
+                    arrays[f'memo{j}_values'] = np.asarray(value[0], dtype=float)
+                    arrays[f'memo{j}_cells'] = np.asarray(value[1], dtype=str)
+                    continue
+                for name, column in zip(('rc', 'ecc'), value):
+                    arrays[f'memo{j}_{name}'] = np.ma.getdata(column).astype(float)
+                    arrays[f'memo{j}_{name}_mask'] = np.ma.getmaskarray(column)
+            manifest = {'version': SESSION_VERSION,
+                        'files': [list(item) for item in self.files.items()],
+                        'tables': tables, 'memo': memo}
+            arrays['manifest'] = np.array(json.dumps(manifest, ensure_ascii=False))
+            with open(path, 'wb') as f:
+                np.savez(f, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """读取save保存的快照（allow_pickle=False），格式或版本不符时抛出ValueError
+
+        之后被修改过的文件在使用时重新解析。
+        """
+        data = np.load(path, allow_pickle=False)
+        try:
+            try:
+                manifest = json.loads(str(data['manifest']))
+            except (IndexError, KeyError, TypeError, ValueError):
+                manifest = None
+            if not isinstance(manifest, dict) or manifest.get('version') != SESSION_VERSION:
+                raise ValueError(f"不支持的会话文件：{path}")
+            session = cls({a: file_path for a, file_path in manifest['files']})
+            for i, entry in enumerate(manifest['tables']):
+                table = ResultsTable(data[f'table{i}_rows'].tolist(),
+                                     data[f'table{i}_cols'].tolist(),
+                                     data[f'table{i}_cells'], data[f'table{i}_values'])
+                session.tables[entry['path']] = (tuple(entry['fingerprint']), table)
+            for j, entry in enumerate(manifest['memo']):
+                key = (entry['kind'], tuple(tuple(item) for item in entry['selection']),
+                       entry['label'])
+                if entry['kind'] == 'distribution':
+                    session.memo[key] = (data[f'memo{j}_values'], data[f'memo{j}_cells'])
+                else:
+                    session.memo[key] = tuple(
+                        np.ma.masked_array(data[f'memo{j}_{name}'], data[f'memo{j}_{name}_mask'])
+                        for name in ('rc', 'ecc'))
+        finally:
+            if hasattr(data, 'close'):
+                data.close()
+        return session
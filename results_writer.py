@@ -0,0 +1,147 @@
+import os
+import math
+from collections import namedtuple
+# NumPy在添加、写出或读取表格时才导入（见各方法），只使用输出设置的图形界面启动时不加载
+
+# 可选的输出格式：制表符分隔文本、打包的压缩NumPy文件、Parquet长表（需要pyarrow）
+FORMATS = ('tsv', 'npz', 'parquet')
+DEFAULT_FORMATS = ('tsv',)
+
+# 输出设置：formats为输出格式，precision为文本保留的小数位数（None为原样输出）
+OutputOptions = namedtuple('OutputOptions', ['formats', 'precision'])
+DEFAULT_OUTPUT = OutputOptions(DEFAULT_FORMATS, None)
+
+def has_parquet():
+    """是否安装了写Parquet所需的pyarrow"""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def check_formats(formats):
+    """检查输出格式，无效或缺少依赖时抛出ValueError"""
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"未知的输出格式：{fmt}（可选：{', '.join(FORMATS)}）")
+    if 'parquet' in formats and not has_parquet():
+        raise ValueError("输出Parquet需要安装pyarrow（pip install pyarrow）")
+
+def format_cell(value, precision=None):
+    """单元格文本：NaN为error；precision为None时与str(value)一致，否则保留precision位小数"""
+    if math.isnan(value):
+        return "error"
+    return str(value) if precision is None else f"{value:.{precision}f}"
+
+class ResultsWriter:
+    """收集一次运行的全部表格，在write()时一次性写出
+
+    tsv为每个表格一个文本文件（与原有格式一致）；npz和parquet把全部表格
+    写入一个文件[bundle_name].npz/.parquet，读取时无需解析文本，见read_bundle。
+    precision为文本中保留的小数位数，None时原样输出。
+    """
+
+    def __init__(self, output_dir, bundle_name, formats=DEFAULT_FORMATS, precision=None):
+        self.output_dir = output_dir
+        self.bundle_name = bundle_name
+        self.formats = tuple(formats)
+        self.precision = precision
+        self.tables = []
+
+    @classmethod
+    def from_options(cls, output_dir, bundle_name, output=DEFAULT_OUTPUT):
+        return cls(output_dir, bundle_name, output.formats, output.precision)
+
+    def add(self, name, row_labels, col_labels, values, text=None, corner="b\\a", header=True,
+            keep_text=False):
+        """添加一个表格
+
+        name为文本文件名（不含扩展名），values为(行 × 列)数值数组，NaN输出为error；
+        text为与values同形状的原始单元格文本，precision为None时按原样写出；
+        keep_text为True时无论precision如何都写出text（如单元格为标签）；
+        header为False时不写表头行。
+        """
+        import numpy as np
+        values = np.asarray(values, dtype=float).reshape(len(row_labels), len(col_labels))
+        self.tables.append((name, [str(r) for r in row_labels], [str(c) for c in col_labels],
+                            values, text, corner, header, keep_text))
+
+    def write(self):
+        """写出全部表格，返回写出的文件路径列表"""
+        paths = []
+        if 'tsv' in self.formats:
+            for table in self.tables:
+                paths.append(self.write_tsv(*table))
+        if 'npz' in self.formats and self.tables:
+            paths.append(self.write_npz())
+        if 'parquet' in self.formats and self.tables:
+            paths.append(self.write_parquet())
+        self.tables = []
+        return paths
+
+    def write_tsv(self, name, row_labels, col_labels, values, text, corner, header, keep_text):
+        output_path = os.path.join(self.output_dir, name + ".txt")
+        lines = []
+        if header:
+            lines.append("\t".join([corner] + col_labels))
+        for i, row_label in enumerate(row_labels):
+            if text is not None and (self.precision is None or keep_text):
+                cells = [str(cell) for cell in text[i]]
+            else:
+                cells = [format_cell(value, self.precision) for value in values[i]]
+            lines.append("\t".join([row_label] + cells))
+        with open(output_path, 'w') as f:
+            f.write("".join(line + "\n" for line in lines))
+        return output_path
+
+    def write_npz(self):
+        import numpy as np
+        arrays = {}
+        for name, row_labels, col_labels, values, *_ in self.tables:
+            arrays[f"{name}/rows"] = np.array(row_labels, dtype=str)
+            arrays[f"{name}/cols"] = np.array(col_labels, dtype=str)
+            arrays[f"{name}/values"] = values
+        output_path = os.path.join(self.output_dir, self.bundle_name + ".npz")
+        np.savez_compressed(output_path, **arrays)
+        return output_path
+
+    def write_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        columns = {'table': [], 'row': [], 'col': [], 'value': []}
+        for name, row_labels, col_labels, values, *_ in self.tables:
+            for i, row_label in enumerate(row_labels):
+                for j, col_label in enumerate(col_labels):
+                    columns['table'].append(name)
+                    columns['row'].append(row_label)
+                    columns['col'].append(col_label)
+                    columns['value'].append(None if math.isnan(values[i, j]) else values[i, j])
+        output_path = os.path.join(self.output_dir, self.bundle_name + ".parquet")
+        pq.write_table(pa.table(columns), output_path)
+        return output_path
+
+def read_bundle(path):
+    """读取npz或parquet结果包，返回{表格名: (行标签列表, 列标签列表, 数值数组)}，按写入顺序排列"""
+    import numpy as np
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        data = pq.read_table(path).to_pydict()
+        tables = {}
+        for name, row, col, value in zip(data['table'], data['row'], data['col'], data['value']):
+            rows, cols, cells = tables.setdefault(name, ([], [], {}))
+            if row not in rows:
+                rows.append(row)
+            if col not in cols:
+                cols.append(col)
+            cells[row, col] = np.nan if value is None else value
+        return {name: (rows, cols, np.array([[cells[r, c] for c in cols] for r in rows]))
+                for name, (rows, cols, cells) in tables.items()}
+
+    tables = {}
+    with np.load(path) as data:
+        for key in data.files:
+            name, part = key.rsplit("/", 1)
+            tables.setdefault(name, {})[part] = data[key]
+    return {name: ([str(r) for r in parts['rows']], [str(c) for c in parts['cols']],
+                   parts['values'])
+            for name, parts in tables.items()}
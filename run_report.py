@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# 报告中记录耗时的阶段
+STAGES = ('listing', 'cache', 'parsing', 'reducing', 'writing')
+
+class RunCancelled(Exception):
+    """运行被用户取消"""
+
+class RunMonitor:
+    """记录每个文件夹、每个文件的读取量和各阶段耗时，并驱动进度回调
+
+    progress(snapshot)在每个文件完成时调用，snapshot为snapshot()返回的字典；
+    cancel为threading.Event，被设置后在下一次进度更新时抛出RunCancelled。
+    """
+
+    def __init__(self, progress=None, folder_count=0, cancel=None):
+        self.progress = progress
+        self.folder_count = folder_count
+        self.cancel = cancel
+        self.folders = []
+        self.total_files = 0
+        self.total_bytes = 0
+        self.done_files = 0
+        self.done_bytes = 0
+        self.start_time = time.perf_counter()
+
+    def start_folder(self, folder_path):
+        """开始处理一个文件夹，返回其记录字典"""
+        folder = {
+            'folder': folder_path,
+            'started': datetime.now().isoformat(timespec='seconds'),
+            'stages': {stage: 0.0 for stage in STAGES},
+            'files': [],
+            '_start': time.perf_counter(),
+        }
+        self.folders.append(folder)
+        return folder
+
+    def plan_files(self, folder, file_paths):
+        """登记文件夹中待处理的文件，用于计算进度和剩余时间"""
+        for file_path in file_paths:
+            try:
+                self.total_bytes += os.path.getsize(file_path)
+            except OSError:
+                pass
+        self.total_files += len(file_paths)
+        self._notify(folder)
+
+    @contextmanager
+    def stage(self, folder, name):
+        """计时上下文，耗时累加到文件夹的对应阶段"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            folder['stages'][name] += time.perf_counter() - start
+
+    def file_done(self, folder, file_path, info, error_count):
+        """登记一个文件的处理结果，info为process_file/reduce_file_stats填写的统计"""
+        record = {
+            'file': os.path.basename(file_path),
+            'bytes': info.get('bytes', 0),
+            'lines': info.get('lines', 0),
+            'error_lines': error_count,
+            'parse_seconds': round(info.get('parse_seconds', 0.0), 6),
+            'reduce_seconds': round(info.get('reduce_seconds', 0.0), 6),
+            'cached': info.get('cached', False),
+            'resumed_bytes': info.get('resumed_bytes', 0),
+        }
+        if 'exception' in info:
+            record['exception'] = info['exception']
+        folder['files'].append(record)
+        folder['stages']['parsing'] += info.get('parse_seconds', 0.0)
+        folder['stages']['reducing'] += info.get('reduce_seconds', 0.0)
+        self.done_files += 1
+        try:
+            self.done_bytes += os.path.getsize(file_path)
+        except OSError:
+            pass
+        self._notify(folder)
+
+    def snapshot(self, folder=None):
+        """当前进度：已完成/总文件数、字节数、速率（MB/s）和预计剩余秒数"""
+        elapsed = time.perf_counter() - self.start_time
+        rate = self.done_bytes / elapsed if elapsed > 0 else 0.0
+        remaining = self.total_bytes - self.done_bytes
+        return {
+            'folder': os.path.basename(os.path.normpath(folder['folder'])) if folder else None,
+            'folder_index': len(self.folders),
+            'folder_count': self.folder_count,
+            'done_files': self.done_files,
+            'total_files': self.total_files,
+            'done_bytes': self.done_bytes,
+            'total_bytes': self.total_bytes,
+            'elapsed': elapsed,
+            'mb_per_s': rate / 1e6,
+            'eta': remaining / rate if rate > 0 else None,
+        }
+
+    def _notify(self, folder):
+        if self.cancel is not None and self.cancel.is_set():
+            raise RunCancelled()
+        if self.progress is not None:
+            self.progress(self.snapshot(folder))
+
+    def folder_report(self, folder):
+        """文件夹的报告字典：汇总、各阶段耗时和逐文件统计"""
+        files = folder['files']
+        wall = time.perf_counter() - folder['_start']
+        total_bytes = sum(f['bytes'] for f in files)
+        return {
+            'folder': folder['folder'],
+            'started': folder['started'],
+            'wall_seconds': round(wall, 6),
+            'files': len(files),
+            'cached_files': sum(1 for f in files if f['cached']),
+            'bytes': total_bytes,
+            'lines': sum(f['lines'] for f in files),
+            'error_lines': sum(f['error_lines'] for f in files),
+            'mb_per_s': round(total_bytes / 1e6 / wall, 3) if wall > 0 else None,
+            # 并行时parsing/reducing为各进程耗时之和，可能大于wall_seconds
+            'stages': {k: round(v, 6) for k, v in folder['stages'].items()},
+            'file_details': files,
+        }
+
+    def write_report(self, folder, output_path):
+        """将文件夹的运行报告写为JSON"""
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(self.folder_report(folder), f, ensure_ascii=False, indent=1)
+        return output_path
+
+def format_seconds(seconds):
+    """将秒数格式化为mm:ss或h:mm:ss，未知时显示--:--"""
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+def format_progress(snapshot):
+    """单行进度文本：文件夹序号、已完成文件数、速率和剩余时间"""
+    return (f"[{snapshot['folder_index']}/{snapshot['folder_count']}] {snapshot['folder']}  "
+            f"{snapshot['done_files']}/{snapshot['total_files']} 个文件  "
+            f"{snapshot['mb_per_s']:.1f} MB/s  剩余 {format_seconds(snapshot['eta'])}")
+
+def terminal_progress(stream=None):
+    """返回在终端单行刷新进度、速率和剩余时间的回调"""
+    stream = stream or sys.stderr
+
+    def callback(snapshot):
+        line = format_progress(snapshot)
+        end = "\n" if snapshot['done_files'] == snapshot['total_files'] else ""
+        stream.write("\r" + line.ljust(79) + end)
+        stream.flush()
+    return callback
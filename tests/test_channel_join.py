@@ -0,0 +1,45 @@
+import numpy as np
+from channel_join import BlockBuffer, iter_aligned, iter_time_blocks, join_record
+from line_errors import DEFAULT_LIMITS, LineErrors
+
+def write_recorder(path, times, values):
+    with open(path, 'w') as f:
+        for t, v in zip(times, values):
+            f.write(f"{float(t)!r} {float(v)!r}\n")
+
+def test_equal_time_steps(tmp_path):
+    times = np.round(np.arange(1, 501) * 0.01, 10)
+    write_recorder(tmp_path / "disp.out", times, times * 2)
+    write_recorder(tmp_path / "acc.out", times, times * 3)
+    record, values, errors, counts = join_record(
+        ("1", str(tmp_path / "disp.out"), str(tmp_path / "acc.out"), ("peak_acc",), 1e-6,
+         DEFAULT_LIMITS))
+    assert counts == (500, 0, 0)
+    assert values["peak_acc"] == times[-1] * 3
+
+def test_mismatched_time_steps(tmp_path):
+    disp_times = np.round(np.arange(1, 2001) * 0.01, 10)
+    acc_times = np.round(np.arange(1, 1001) * 0.02, 10)
+    write_recorder(tmp_path / "disp.out", disp_times, disp_times * 2)
+    write_recorder(tmp_path / "acc.out", acc_times, acc_times * 3)
+    errors = LineErrors(DEFAULT_LIMITS)
+    # 小块读取，使配对跨越多个块
+    disp = BlockBuffer(iter_time_blocks(str(tmp_path / "disp.out"), errors, chunk_bytes=997))
+    acc = BlockBuffer(iter_time_blocks(str(tmp_path / "acc.out"), errors, chunk_bytes=1499))
+    joined = list(iter_aligned(disp, acc, 1e-6))
+    times = np.concatenate([block[0] for block in joined])
+    np.testing.assert_array_equal(times, acc_times)
+    np.testing.assert_array_equal(np.concatenate([block[1] for block in joined]), acc_times * 2)
+    np.testing.assert_array_equal(np.concatenate([block[2] for block in joined]), acc_times * 3)
+    assert (disp.unmatched, acc.unmatched) == (1000, 0)
+
+def test_offset_start_and_end(tmp_path):
+    disp_times = np.round(np.arange(0, 100) * 0.1, 10)
+    acc_times = np.round(np.arange(30, 150) * 0.1, 10)
+    write_recorder(tmp_path / "disp.out", disp_times, disp_times)
+    write_recorder(tmp_path / "acc.out", acc_times, acc_times)
+    record, values, errors, counts = join_record(
+        ("1", str(tmp_path / "disp.out"), str(tmp_path / "acc.out"), ("peak_acc",), 1e-6,
+         DEFAULT_LIMITS))
+    assert counts == (70, 30, 50)
+    assert values["peak_acc"] == disp_times[-1]
@@ -0,0 +1,34 @@
+import os
+from process_barfiber import process_file
+from recorder_store import convert_folder, open_columnar, store_dir
+
+def write_recorder(path, rows):
+    with open(path, 'w') as f:
+        for row in rows:
+            f.write(" ".join(repr(value) for value in row) + "\n")
+
+def test_missing_array_falls_back_to_text(tmp_path):
+    for name, sign in (("S2_B4_IDA_8.5MPa_barfiber-6.5.out", 1),
+                       ("S2_B12_IDA_8.5MPa_barfiber-6.5.out", -1)):
+        write_recorder(tmp_path / name, [(0.01 * i, sign * 0.001 * i) for i in range(1, 101)])
+    manifest = convert_folder(str(tmp_path))
+    missing = tmp_path / "S2_B12_IDA_8.5MPa_barfiber-6.5.out"
+    os.remove(os.path.join(store_dir(str(tmp_path)), manifest['files'][missing.name]['array']))
+
+    assert open_columnar(str(missing)) is None
+    assert open_columnar(str(tmp_path / "S2_B4_IDA_8.5MPa_barfiber-6.5.out")) is not None
+    max_abs, errors = process_file(str(missing))
+    assert max_abs == 0.1
+    assert not errors
+
+def test_truncated_array_falls_back_to_text(tmp_path):
+    path = tmp_path / "S2_B4_IDA_8.5MPa_barfiber-6.5.out"
+    write_recorder(path, [(0.01 * i, 0.002 * i) for i in range(1, 101)])
+    manifest = convert_folder(str(tmp_path))
+    array_path = os.path.join(store_dir(str(tmp_path)), manifest['files'][path.name]['array'])
+    with open(array_path, 'r+b') as f:
+        f.truncate(os.path.getsize(array_path) // 2)
+
+    assert open_columnar(str(path)) is None
+    max_abs, errors = process_file(str(path))
+    assert max_abs == 0.2
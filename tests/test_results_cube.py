@@ -0,0 +1,26 @@
+import numpy as np
+from results_cube import ResultsCube
+
+def write_table(path, records, rows):
+    with open(path, 'w') as f:
+        f.write("b\\a\t" + "\t".join(records) + "\n")
+        for position, cells in rows:
+            f.write(f"{position}\t" + "\t".join(cells) + "\n")
+
+def test_mismatched_headers_align_by_record(tmp_path):
+    write_table(tmp_path / "h300.txt", ["B12", "B18"],
+                [("18.8", ["1.2", "1.8"]), ("40", ["2.2", "2.8"])])
+    write_table(tmp_path / "h500.txt", ["B4", "B12"],
+                [("18.8", ["5.04", "5.12"]), ("40", ["error", "6.12"])])
+    cube = ResultsCube.from_files({300: str(tmp_path / "h300.txt"),
+                                   500: str(tmp_path / "h500.txt")})
+    assert cube.intensities == ["B4", "B12", "B18"]
+    assert cube.distribution("B12").tolist() == [["1.2", "5.12"], ["2.2", "6.12"]]
+    assert cube.distribution("B4").tolist() == [["error", "5.04"], ["error", "error"]]
+    assert cube.distribution("B18").tolist() == [["1.8", "error"], ["2.8", "error"]]
+    rc, ecc = cube.rc_ecc_max(intensities=["B4", "B12", "B18"])
+    # 高度300：RC只含位置18.8，ECC只含位置40；高度500：RC含两个位置，没有ECC位置
+    np.testing.assert_array_equal(rc.filled(np.nan),
+                                  [[np.nan, 1.2, 1.8], [5.04, 6.12, np.nan]])
+    np.testing.assert_array_equal(ecc.filled(np.nan),
+                                  [[np.nan, 2.2, 2.8], [np.nan, np.nan, np.nan]])
@@ -0,0 +1,41 @@
+import pickle
+import numpy as np
+import pytest
+from results_session import ResultsSession
+
+def write_table(path, records, rows):
+    with open(path, 'w') as f:
+        f.write("b\\a\t" + "\t".join(records) + "\n")
+        for position, cells in rows:
+            f.write(f"{position}\t" + "\t".join(cells) + "\n")
+
+def test_save_and_load_round_trip(tmp_path):
+    write_table(tmp_path / "h300.txt", ["B4", "B12"],
+                [("18.8", ["1.04", "1.12"]), ("40", ["error", "2.12"])])
+    write_table(tmp_path / "h500.txt", ["B4", "B12"],
+                [("18.8", ["5.04", "5.12"]), ("40", ["6.04", "6.12"])])
+    files = {300: str(tmp_path / "h300.txt"), 500: str(tmp_path / "h500.txt")}
+    session = ResultsSession(files)
+    values, cells = session.distribution(files, "B4")
+    rc, ecc = session.rc_ecc(files, ["B4", "B12"])
+    path = session.save(str(tmp_path / "session.npz"))
+
+    loaded = ResultsSession.load(path)
+    assert loaded.files == files
+    assert set(loaded.tables) == set(session.tables)
+    assert not any(key[0] == 'cube' for key in loaded.memo)
+    # 结果直接取自快照，不再计算
+    loaded_values, loaded_cells = loaded.distribution(files, "B4")
+    np.testing.assert_array_equal(loaded_values, values)
+    assert loaded_cells.tolist() == cells.tolist()
+    loaded_rc, loaded_ecc = loaded.rc_ecc(files, ["B4", "B12"])
+    np.testing.assert_array_equal(loaded_rc.filled(np.nan), rc.filled(np.nan))
+    np.testing.assert_array_equal(np.ma.getmaskarray(loaded_ecc), np.ma.getmaskarray(ecc))
+    assert loaded.table(files[300]).cells.tolist() == session.table(files[300]).cells.tolist()
+
+def test_load_rejects_pickle(tmp_path):
+    path = tmp_path / "session.npz"
+    with open(path, 'wb') as f:
+        pickle.dump({'version': 1, 'files': {}}, f)
+    with pytest.raises(ValueError):
+        ResultsSession.load(str(path))